@@ -1,9 +1,8 @@
 from logging.config import fileConfig
-import os
 from sqlalchemy import engine_from_config, pool
 from alembic import context
 from app.models import Base
-from dotenv import load_dotenv
+from app.database import SQLALCHEMY_DATABASE_URL
 
 
 
@@ -17,19 +16,6 @@ if config.config_file_name is not None:
 # Add your model's MetaData object here for 'autogenerate' support
 target_metadata = Base.metadata
 
-# Load environment variables from .env file
-load_dotenv()
-
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
-
-SQLALCHEMY_DATABASE_URL = (
-    f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-)
-
 config.set_main_option('sqlalchemy.url', SQLALCHEMY_DATABASE_URL)
 
 def run_migrations_offline() -> None:
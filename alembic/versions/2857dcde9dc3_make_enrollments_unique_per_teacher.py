@@ -0,0 +1,39 @@
+"""Make enrollments unique per course and teacher
+
+Revision ID: 2857dcde9dc3
+Revises: 6d0fb2d39b8e
+Create Date: 2026-10-17 12:08:44.561203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2857dcde9dc3'
+down_revision: Union[str, None] = '6d0fb2d39b8e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the first of any duplicated enrollments before adding the constraint
+    op.execute("""
+        DELETE FROM student_courses duplicate
+        USING student_courses original
+        WHERE duplicate.course_id = original.course_id
+          AND duplicate.teacher_id = original.teacher_id
+          AND duplicate.student_id = original.student_id
+          AND duplicate.id > original.id
+    """)
+
+    # The constraint's index replaces the plain composite index on the same columns
+    op.drop_index('ix_student_courses_course_id_teacher_id_student_id', table_name='student_courses')
+    op.create_unique_constraint('uq_student_courses_course_id_teacher_id_student_id', 'student_courses', ['course_id', 'teacher_id', 'student_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_student_courses_course_id_teacher_id_student_id', 'student_courses', type_='unique')
+    op.create_index('ix_student_courses_course_id_teacher_id_student_id', 'student_courses', ['course_id', 'teacher_id', 'student_id'])
@@ -0,0 +1,53 @@
+"""Add attendance_weekly_summary rollup table
+
+Revision ID: 2913904cc1de
+Revises: 2857dcde9dc3
+Create Date: 2026-10-17 12:37:19.408215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2913904cc1de'
+down_revision: Union[str, None] = '2857dcde9dc3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('attendance_weekly_summary',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('week_start', sa.Date(), nullable=False),
+    sa.Column('present', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('absent', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('excused', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('late', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('total', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('student_id', 'course_id', 'week_start')
+    )
+    op.create_index('ix_attendance_weekly_summary_week_start_course_id', 'attendance_weekly_summary', ['week_start', 'course_id'])
+
+    # Backfill from the existing attendance records
+    op.execute("""
+        INSERT INTO attendance_weekly_summary (student_id, course_id, week_start, present, absent, excused, late, total)
+        SELECT student_id, course_id, date_trunc('week', attendance_date)::date,
+               count(*) FILTER (WHERE lower(status) = 'present'),
+               count(*) FILTER (WHERE lower(status) = 'absent'),
+               count(*) FILTER (WHERE lower(status) = 'excused'),
+               count(*) FILTER (WHERE lower(status) = 'late'),
+               count(*)
+        FROM attendance
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_attendance_weekly_summary_week_start_course_id', table_name='attendance_weekly_summary')
+    op.drop_table('attendance_weekly_summary')
@@ -0,0 +1,99 @@
+"""Record attendance per session date and partition it by month
+
+Revision ID: 561d4a3ae2ed
+Revises: 74594fa2bca3
+Create Date: 2026-10-17 09:12:41.508327
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '561d4a3ae2ed'
+down_revision: Union[str, None] = '74594fa2bca3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Monthly partitions created ahead of the current month; `python -m app.partitions` extends them later
+MONTHS_AHEAD = 12
+
+
+def _next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    # A plain table can't be turned into a partitioned one, so move the old table aside
+    op.rename_table('attendance', 'attendance_old')
+    op.execute("ALTER INDEX attendance_pkey RENAME TO attendance_old_pkey")
+    op.execute("ALTER SEQUENCE attendance_id_seq OWNED BY NONE")
+
+    # The partition key has to be part of the primary key and of every unique index
+    op.create_table('attendance',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('attendance_id_seq')"), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('attendance_date', sa.Date(), server_default=sa.text('CURRENT_DATE'), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', 'attendance_date'),
+    postgresql_partition_by='RANGE (attendance_date)'
+    )
+    op.create_index('ix_attendance_course_id_attendance_date_student_id', 'attendance',
+                    ['course_id', 'attendance_date', 'student_id'], unique=True)
+    op.execute("ALTER SEQUENCE attendance_id_seq OWNED BY attendance.id")
+
+    # One partition per month from the oldest record, plus a default partition as a safety net
+    oldest = op.get_bind().execute(sa.text("SELECT min(attendance_date)::date FROM attendance_old")).scalar()
+    month = (oldest or date.today()).replace(day=1)
+    last = date.today().replace(day=1)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE attendance_y{month.year}m{month.month:02d} PARTITION OF attendance "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        )
+        month = _next_month(month)
+    op.execute("CREATE TABLE attendance_default PARTITION OF attendance DEFAULT")
+
+    # Keep the latest record of each student/course/day
+    op.execute("""
+        INSERT INTO attendance (id, student_id, course_id, attendance_date, status)
+        SELECT DISTINCT ON (course_id, COALESCE(attendance_date, NOW())::date, student_id)
+               id, student_id, course_id, COALESCE(attendance_date, NOW())::date, status
+        FROM attendance_old
+        ORDER BY course_id, COALESCE(attendance_date, NOW())::date, student_id, id DESC
+    """)
+    op.drop_table('attendance_old')
+
+
+def downgrade() -> None:
+    op.rename_table('attendance', 'attendance_partitioned')
+    op.execute("ALTER SEQUENCE attendance_id_seq OWNED BY NONE")
+
+    op.create_table('attendance',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('attendance_id_seq')"), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('attendance_date', sa.TIMESTAMP(timezone=True), server_default=sa.text('NOW()'), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name='attendance_pkey_plain')
+    )
+    op.execute("ALTER SEQUENCE attendance_id_seq OWNED BY attendance.id")
+
+    op.execute("""
+        INSERT INTO attendance (id, student_id, course_id, attendance_date, status)
+        SELECT id, student_id, course_id, attendance_date, status FROM attendance_partitioned
+    """)
+    # Dropping the parent drops every partition with it
+    op.drop_table('attendance_partitioned')
+    op.execute("ALTER INDEX attendance_pkey_plain RENAME TO attendance_pkey")
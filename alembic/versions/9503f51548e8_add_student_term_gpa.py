@@ -0,0 +1,68 @@
+"""Add student_term_gpa summary table
+
+Revision ID: 9503f51548e8
+Revises: 2913904cc1de
+Create Date: 2026-10-17 13:05:52.730144
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9503f51548e8'
+down_revision: Union[str, None] = '2913904cc1de'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('student_term_gpa',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('term_start', sa.Date(), nullable=False),
+    sa.Column('points', sa.Numeric(precision=10, scale=2), server_default=sa.text('0'), nullable=False),
+    sa.Column('graded_courses', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('student_id', 'term_start')
+    )
+
+    # Backfill from the existing grades with the default grade scale and terms of this revision (letter
+    # grades, 90/80/70/60 for numeric ones, terms starting in January, June and August). With other
+    # settings, rebuild the summary afterwards with `python -m app.transcripts`.
+    op.execute("""
+        INSERT INTO student_term_gpa (student_id, term_start, points, graded_courses)
+        SELECT student_id, term_start, sum(points), count(*)
+        FROM (
+            SELECT student_id,
+                   make_date(extract(year FROM graded_at)::int,
+                             CASE WHEN extract(month FROM graded_at) >= 8 THEN 8
+                                  WHEN extract(month FROM graded_at) >= 6 THEN 6
+                                  ELSE 1 END,
+                             1) AS term_start,
+                   CASE upper(trim(grade))
+                       WHEN 'A+' THEN 4.0 WHEN 'A' THEN 4.0 WHEN 'A-' THEN 3.7
+                       WHEN 'B+' THEN 3.3 WHEN 'B' THEN 3.0 WHEN 'B-' THEN 2.7
+                       WHEN 'C+' THEN 2.3 WHEN 'C' THEN 2.0 WHEN 'C-' THEN 1.7
+                       WHEN 'D+' THEN 1.3 WHEN 'D' THEN 1.0 WHEN 'D-' THEN 0.7
+                       WHEN 'F' THEN 0.0
+                       ELSE CASE WHEN trim(grade) ~ '^[+-]?([0-9]+[.]?[0-9]*|[.][0-9]+)$' THEN
+                           CASE WHEN trim(grade)::numeric >= 90 THEN 4.0
+                                WHEN trim(grade)::numeric >= 80 THEN 3.0
+                                WHEN trim(grade)::numeric >= 70 THEN 2.0
+                                WHEN trim(grade)::numeric >= 60 THEN 1.0
+                                WHEN trim(grade)::numeric >= 0 THEN 0.0
+                           END
+                       END
+                   END AS points
+            FROM grades
+            WHERE graded_at IS NOT NULL
+        ) AS graded
+        WHERE points IS NOT NULL
+        GROUP BY student_id, term_start
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('student_term_gpa')
@@ -0,0 +1,53 @@
+"""Add indexes for hot lookup paths
+
+Revision ID: a12060a3b6e4
+Revises: 561d4a3ae2ed
+Create Date: 2026-10-17 10:03:27.114902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a12060a3b6e4'
+down_revision: Union[str, None] = '561d4a3ae2ed'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Role dependencies resolve teachers/students from the token's user_id
+    op.create_index('ix_teachers_user_id', 'teachers', ['user_id'])
+    op.create_index('ix_students_user_id', 'students', ['user_id'])
+    op.create_index('ix_students_guardian_email', 'students', ['guardian_email'])
+    op.create_index('ix_courses_teacher_id', 'courses', ['teacher_id'])
+
+    # Course rosters, enrollment duplicate checks and teacher_verify_course
+    op.create_index('ix_student_courses_course_id_teacher_id_student_id', 'student_courses', ['course_id', 'teacher_id', 'student_id'])
+    op.create_index('ix_student_courses_student_id', 'student_courses', ['student_id'])
+    op.create_index('ix_student_courses_teacher_id', 'student_courses', ['teacher_id'])
+
+    # Course attendance view and student attendance view (created on every partition)
+    op.create_index('ix_attendance_course_id_status', 'attendance', ['course_id', 'status'])
+    op.create_index('ix_attendance_student_id_attendance_date', 'attendance', ['student_id', 'attendance_date'])
+
+    # Grade duplicate checks, student grade view and per-course grade lookups
+    op.create_index('ix_grades_student_id_course_id', 'grades', ['student_id', 'course_id'])
+    op.create_index('ix_grades_course_id', 'grades', ['course_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_grades_course_id', table_name='grades')
+    op.drop_index('ix_grades_student_id_course_id', table_name='grades')
+    op.drop_index('ix_attendance_student_id_attendance_date', table_name='attendance')
+    op.drop_index('ix_attendance_course_id_status', table_name='attendance')
+    op.drop_index('ix_student_courses_teacher_id', table_name='student_courses')
+    op.drop_index('ix_student_courses_student_id', table_name='student_courses')
+    op.drop_index('ix_student_courses_course_id_teacher_id_student_id', table_name='student_courses')
+    op.drop_index('ix_courses_teacher_id', table_name='courses')
+    op.drop_index('ix_students_guardian_email', table_name='students')
+    op.drop_index('ix_students_user_id', table_name='students')
+    op.drop_index('ix_teachers_user_id', table_name='teachers')
@@ -0,0 +1,89 @@
+import threading
+from sqlalchemy.orm import Session
+from . import models
+from .cache import TTLCache
+from .config import settings
+
+
+# Per teacher: the set of (student_id, course_id) pairs the teacher is assigned to in student_courses.
+# A teacher's set is loaded with one query on first use and then kept up to date by the enrollment
+# and delete endpoints, so authorization checks are set membership tests instead of database queries.
+# Other workers' changes reach this one through the TTL; a pair missing from the set is re-checked
+# against the database before access is denied.
+class AssignmentIndex:
+    def __init__(self, maxsize: int, ttl: float):
+        self._teachers = TTLCache("teacher_assignments", maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def _load(self, teacher_id: int, db: Session) -> set:
+        assignments = self._teachers.get(teacher_id)
+        if assignments is None:
+            rows = db.query(models.StudentCourse.student_id, models.StudentCourse.course_id).filter(
+                models.StudentCourse.teacher_id == teacher_id
+            ).all()
+            assignments = {(row.student_id, row.course_id) for row in rows}
+            self._teachers.set(teacher_id, assignments)
+        return assignments
+
+    def is_assigned(self, teacher_id: int, student_id: int, course_id: int, db: Session) -> bool:
+        if (student_id, course_id) in self._load(teacher_id, db):
+            return True
+
+        # Could have been enrolled through another worker since the set was loaded
+        exists = db.query(models.StudentCourse.id).filter(
+            models.StudentCourse.teacher_id == teacher_id,
+            models.StudentCourse.student_id == student_id,
+            models.StudentCourse.course_id == course_id
+        ).first()
+        if exists:
+            self.add(teacher_id, student_id, course_id)
+        return exists is not None
+
+    # Students of a course the teacher is assigned to. Requested students missing from the set (or, with
+    # none requested, a course with no students in the set) are re-checked against the database in one query.
+    def assigned_students(self, teacher_id: int, course_id: int, db: Session, student_ids: set = None) -> set:
+        assignments = self._load(teacher_id, db)
+        with self._lock:
+            assigned = {student_id for student_id, assigned_course_id in assignments if assigned_course_id == course_id}
+
+        missing = student_ids - assigned if student_ids is not None else None
+        if missing == set() or (missing is None and assigned):
+            return assigned
+
+        # Could have been enrolled through another worker since the set was loaded
+        query = db.query(models.StudentCourse.student_id).filter(
+            models.StudentCourse.teacher_id == teacher_id,
+            models.StudentCourse.course_id == course_id
+        )
+        if missing is not None:
+            query = query.filter(models.StudentCourse.student_id.in_(missing))
+        for row in query:
+            self.add(teacher_id, row.student_id, course_id)
+            assigned.add(row.student_id)
+        return assigned
+
+    # Incremental maintenance, only teachers whose set is already loaded are touched
+    def add(self, teacher_id: int, student_id: int, course_id: int):
+        with self._lock:
+            assignments = self._teachers.peek(teacher_id)
+            if assignments is not None:
+                assignments.add((student_id, course_id))
+
+    def discard_student(self, student_id: int):
+        with self._lock:
+            for _, assignments in self._teachers.items():
+                assignments.difference_update({pair for pair in assignments if pair[0] == student_id})
+
+    def discard_course(self, course_id: int):
+        with self._lock:
+            for _, assignments in self._teachers.items():
+                assignments.difference_update({pair for pair in assignments if pair[1] == course_id})
+
+    def discard_teacher(self, teacher_id: int):
+        self._teachers.invalidate(teacher_id)
+
+    def clear(self):
+        self._teachers.clear()
+
+
+assignments = AssignmentIndex(maxsize=settings.ASSIGNMENT_INDEX_MAX_TEACHERS, ttl=settings.ASSIGNMENT_INDEX_TTL_SECONDS)
@@ -1,3 +1,4 @@
+from typing import Dict, List, Literal, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -9,6 +10,66 @@ class Settings(BaseSettings):
     DB_HOST: str
     DB_PORT: str
     DB_NAME: str
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    # Verified access tokens kept in memory so their signature is checked once per worker
+    TOKEN_CACHE_MAX_SIZE: int = 50000
+    # Connection pool, per engine and per worker process
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30  # Seconds to wait for a connection before giving up
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced, -1 disables
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 30000  # 0 disables
+    # bcrypt cost for new hashes; existing hashes are upgraded on the next successful login
+    BCRYPT_ROUNDS: int = 12
+    # Process pool verifying passwords on login (0 = one process per CPU)
+    PASSWORD_HASH_WORKERS: int = 0
+    PASSWORD_HASH_QUEUE_PER_WORKER: int = 4
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = 5  # Seconds to wait for a slot before answering 503
+    # Bulk user import: rows per COPY chunk and hashing processes (0 = one process per CPU)
+    IMPORT_CHUNK_SIZE: int = 1000
+    IMPORT_HASH_WORKERS: int = 0
+    # Rows fetched from the server-side cursor per batch when streaming an export
+    EXPORT_BATCH_SIZE: int = 1000
+    # Fraction of granted role checks that get logged (denials are always logged)
+    AUTH_LOG_SAMPLE_RATE: float = 0.01
+    # In-process user_id -> teacher_id/student_id cache
+    IDENTITY_CACHE_TTL_SECONDS: int = 300
+    IDENTITY_CACHE_MAX_SIZE: int = 10000
+    # In-process teacher -> (student, course) assignment index
+    ASSIGNMENT_INDEX_TTL_SECONDS: int = 600
+    ASSIGNMENT_INDEX_MAX_TEACHERS: int = 5000
+    # In-process course gradebooks, dropped when a grade or enrollment of the course changes
+    GRADEBOOK_CACHE_TTL_SECONDS: int = 300
+    GRADEBOOK_CACHE_MAX_SIZE: int = 1000
+    # GPA points per letter grade, and per minimum score for numeric grades (highest first).
+    # Set as JSON in the environment; run `python -m app.transcripts` after changing them.
+    GRADE_SCALE: Dict[str, float] = {
+        "A+": 4.0, "A": 4.0, "A-": 3.7, "B+": 3.3, "B": 3.0, "B-": 2.7, "C+": 2.3,
+        "C": 2.0, "C-": 1.7, "D+": 1.3, "D": 1.0, "D-": 0.7, "F": 0.0
+    }
+    NUMERIC_GRADE_SCALE: List[List[float]] = [[90, 4.0], [80, 3.0], [70, 2.0], [60, 1.0], [0, 0.0]]
+    # Terms by the month they start in; a grade belongs to the term its graded_at falls in
+    TERM_START_MONTHS: Dict[int, str] = {1: "Spring", 6: "Summer", 8: "Fall"}
+    # Response cache of the read-heavy GET routes: "memory" (per worker), "redis" (shared, needs
+    # the redis package) or "none"
+    RESPONSE_CACHE_BACKEND: str = "memory"
+    RESPONSE_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    RESPONSE_CACHE_TTL_SECONDS: int = 60
+    RESPONSE_CACHE_MAX_SIZE: int = 10000
+
+    # Per route request and SQL metrics, exposed in the Prometheus format on /metrics. When a token
+    # is set, scrapers have to send it as `Authorization: Bearer <token>`
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None
+
+    # Development aids for tests and staging. N+1 detection reports statements repeated at least
+    # N_PLUS_ONE_THRESHOLD times within one request, per route on /admin/monitoring/queries.
+    # LAZY_LOAD_GUARD "warn" adds lazy relationship loads to that report, "raise" makes every
+    # relationship that a query didn't load explicitly raise instead of emitting SQL
+    N_PLUS_ONE_DETECTION: bool = False
+    N_PLUS_ONE_THRESHOLD: int = 3
+    LAZY_LOAD_GUARD: Literal["off", "warn", "raise"] = "off"
 
     class Config:
         env_file = ".env"
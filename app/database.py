@@ -1,20 +1,117 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 
 from .config import settings  # Import your settings
+from .metrics import Counter, Histogram, current_request
+
+
+# Checkout wait time and timeouts per pool, exposed by the monitoring router
+pool_wait_seconds = {"sync": Histogram(), "async": Histogram()}
+pool_timeouts = {"sync": Counter(), "async": Counter()}
+
+
+# Time every checkout, including waiting for a free connection or opening an overflow one
+class TimedCheckoutMixin:
+    pool_name = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_timeouts[self.pool_name].inc()
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            pool_wait_seconds[self.pool_name].observe(waited)
+            stats = current_request.get()
+            if stats is not None:
+                stats.pool_wait_seconds += waited
+
+
+class TimedQueuePool(TimedCheckoutMixin, QueuePool):
+    pool_name = "sync"
+
+
+class TimedAsyncQueuePool(TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pool_name = "async"
+
+
+POOL_OPTIONS = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
 
 SQLALCHEMY_DATABASE_URL = (
     f"postgresql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
 )
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=TimedQueuePool,
+    connect_args={"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"},
+    **POOL_OPTIONS
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# asyncio engine used by the `async def` handlers, so they don't occupy a threadpool worker while waiting on PostgreSQL
+ASYNC_SQLALCHEMY_DATABASE_URL = (
+    f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+)
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    poolclass=TimedAsyncQueuePool,
+    connect_args={"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}},
+    **POOL_OPTIONS
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+# Statement count, database time and rows of the request being served (see app/instrumentation.py).
+# Statements run outside a request, e.g. by the CLI tools, aren't recorded.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_request.get() is not None:
+        conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    if stats is None:
+        return
+    stats.statements += 1
+    stats.db_seconds += time.perf_counter() - conn.info.pop("query_started", time.perf_counter())
+    # Drivers report -1 when they don't know the row count, e.g. asyncpg for a SELECT
+    if cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+
+
+for instrumented in (engine, async_engine.sync_engine):
+    event.listen(instrumented, "before_cursor_execute", _before_cursor_execute)
+    event.listen(instrumented, "after_cursor_execute", _after_cursor_execute)
+
 Base = declarative_base()
 
+
+# Current state of a pool, for the monitoring router
+def pool_status(pool, name: str) -> dict:
+    return {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "timeouts": pool_timeouts[name].value,
+        "checkout_wait_seconds": pool_wait_seconds[name].snapshot(),
+    }
+
+
 # Connection for SQLALCHEMY 
 # Dependency
 def get_db():
@@ -25,4 +122,10 @@ def get_db():
         db.close()
 
 
+# Dependency for async handlers
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 
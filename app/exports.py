@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Iterator
+from sqlalchemy import Select
+from .config import settings
+from .database import SessionLocal
+
+
+EXPORT_FORMATS = ("csv", "ndjson")
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+# Encode one batch of rows; CSV output starts with a header line
+def _encode(columns: list, rows, fmt: str, header: bool) -> bytes:
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        if header:
+            writer.writerow(columns)
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            buffer.write(json.dumps(dict(zip(columns, row)), default=_json_default))
+            buffer.write("\n")
+    return buffer.getvalue().encode("utf-8")
+
+
+# Stream the rows of a select as CSV or NDJSON, optionally gzip compressed. The rows are fetched
+# from a server-side cursor in batches of EXPORT_BATCH_SIZE and every batch is encoded and sent
+# before the next one is fetched, so memory stays constant whatever the size of the result.
+# The generator opens its own session because the request's one is closed before streaming starts.
+def stream_rows(statement: Select, fmt: str, compress: bool = False) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 writes a gzip container
+    db = SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+        header = True
+        for rows in result.partitions():
+            chunk = _encode(columns, rows, fmt, header)
+            header = False
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+
+        # An empty result still gets its CSV header
+        if header and fmt == "csv":
+            chunk = _encode(columns, [], fmt, header)
+            yield compressor.compress(chunk) if compressor else chunk
+    finally:
+        db.close()
+
+    if compressor:
+        yield compressor.flush()
+
+
+# Compressed exports are sent with Content-Encoding: gzip, which HTTP clients decompress transparently
+def export_headers(name: str, fmt: str, compress: bool) -> dict:
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return headers
@@ -0,0 +1,112 @@
+from sqlalchemy import Numeric, and_, case, cast, func, select, tuple_
+from sqlalchemy.orm import Session
+from . import models, schemas
+from .cache import TTLCache
+from .config import settings
+
+
+# Built gradebooks per course_id, dropped by the grade and enrollment endpoints when the course changes
+gradebooks = TTLCache("course_gradebooks", maxsize=settings.GRADEBOOK_CACHE_MAX_SIZE, ttl=settings.GRADEBOOK_CACHE_TTL_SECONDS)
+
+# Grades are free text: numbers count towards mean/median, anything else is a letter grade
+NUMERIC_GRADE = r'^\s*\d+(\.\d+)?\s*$'
+
+
+def invalidate_gradebook(course_id: int):
+    gradebooks.invalidate(course_id)
+
+
+# Gradebooks embed the students' names and emails, so a user change drops those of the student's courses
+def invalidate_student_gradebooks(user_id: int, db: Session):
+    course_ids = db.query(models.StudentCourse.course_id).join(
+        models.Student, models.Student.id == models.StudentCourse.student_id
+    ).filter(models.Student.user_id == user_id).distinct()
+    for course_id, in course_ids:
+        gradebooks.invalidate(course_id)
+
+
+# One grouped query over the course roster left joined with its grades. GROUPING SETS returns, in a
+# single result: one row per enrolled student, one row per letter grade and one row for the whole course.
+def gradebook_statement(course_id: int):
+    roster = select(models.StudentCourse.student_id).where(
+        models.StudentCourse.course_id == course_id
+    ).distinct().subquery()
+
+    is_numeric = models.Grade.grade.regexp_match(NUMERIC_GRADE)
+    graded = select(
+        roster.c.student_id,
+        models.User.first_name,
+        models.User.last_name,
+        models.User.email,
+        models.Grade.id.label("grade_id"),
+        models.Grade.grade,
+        models.Grade.graded_at,
+        case((is_numeric, cast(func.trim(models.Grade.grade), Numeric))).label("numeric_grade"),
+        case((is_numeric, None), else_=func.upper(func.trim(models.Grade.grade))).label("letter_grade")
+    ).select_from(roster) \
+     .join(models.Student, models.Student.id == roster.c.student_id) \
+     .join(models.User, models.User.id == models.Student.user_id) \
+     .outerjoin(models.Grade, and_(models.Grade.student_id == roster.c.student_id, models.Grade.course_id == course_id)) \
+     .subquery()
+
+    student_columns = (graded.c.student_id, graded.c.first_name, graded.c.last_name, graded.c.email,
+                       graded.c.grade_id, graded.c.grade, graded.c.graded_at, graded.c.letter_grade)
+
+    return select(
+        *student_columns,
+        func.grouping(graded.c.student_id).label("is_summary"),
+        func.grouping(graded.c.letter_grade).label("is_total"),
+        func.count().label("students"),
+        func.count(graded.c.grade).label("graded"),
+        func.count(graded.c.numeric_grade).label("numeric_graded"),
+        func.avg(graded.c.numeric_grade).label("mean"),
+        func.percentile_cont(0.5).within_group(graded.c.numeric_grade).label("median")
+    ).group_by(
+        func.grouping_sets(tuple_(*student_columns), tuple_(graded.c.letter_grade), tuple_())
+    ).order_by("is_summary", "is_total", graded.c.last_name, graded.c.first_name, graded.c.student_id)
+
+
+def build_gradebook(course: models.Course, rows) -> schemas.CourseGradebook:
+    students = []
+    distribution = {}
+    totals = None
+    for row in rows:
+        if not row.is_summary:
+            students.append(schemas.GradebookEntry(
+                student_id=row.student_id,
+                first_name=row.first_name,
+                last_name=row.last_name,
+                email=row.email,
+                grade_id=row.grade_id,
+                grade=row.grade,
+                graded_at=row.graded_at.date() if row.graded_at else None
+            ))
+        elif not row.is_total:
+            # The NULL group holds the numeric and the missing grades
+            if row.letter_grade is not None:
+                distribution[row.letter_grade] = row.graded
+        else:
+            totals = row
+
+    return schemas.CourseGradebook(
+        course_id=course.id,
+        course_name=course.course_name,
+        students=students,
+        statistics=schemas.GradebookStatistics(
+            enrolled=totals.students,
+            graded=totals.graded,
+            missing=totals.students - totals.graded,
+            distribution=distribution,
+            numeric_graded=totals.numeric_graded,
+            mean=round(float(totals.mean), 2) if totals.mean is not None else None,
+            median=float(totals.median) if totals.median is not None else None
+        )
+    )
+
+
+def load_gradebook(course: models.Course, db: Session) -> schemas.CourseGradebook:
+    gradebook = gradebooks.get(course.id)
+    if gradebook is None:
+        gradebook = build_gradebook(course, db.execute(gradebook_statement(course.id)).all())
+        gradebooks.set(course.id, gradebook)
+    return gradebook
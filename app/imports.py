@@ -0,0 +1,376 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Callable, Iterable, Iterator
+from fastapi import UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import models, schemas, utils
+from .config import settings
+from .database import SessionLocal
+
+
+IMPORT_FORMATS = ("csv", "ndjson")
+USER_IMPORT_COLUMNS = ("email", "password", "first_name", "last_name", "role_id")
+PROFILE_KINDS = ("student", "teacher")
+STUDENT_ROLE_ID = 3
+TEACHER_ROLE_ID = 2
+
+
+def import_format(filename: str, requested: str = None) -> str:
+    if requested:
+        return requested
+    return "ndjson" if filename and filename.lower().endswith((".ndjson", ".jsonl")) else "csv"
+
+
+# Yield (line, record, error) for every row of a CSV (with header) or NDJSON stream
+def read_records(lines: Iterable[str], fmt: str) -> Iterator[tuple]:
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None, "Invalid JSON"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "Each line has to be a JSON object"
+            continue
+        yield line_number, record, None
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _row_error(line: int, email, detail: str) -> dict:
+    return {"line": line, "email": email, "status": "error", "detail": detail}
+
+
+def _validation_detail(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in exc.errors())
+
+
+def hash_workers() -> int:
+    return settings.IMPORT_HASH_WORKERS or os.cpu_count() or 1
+
+
+# Hash a batch of passwords across the executor's processes
+def hash_passwords(executor: ProcessPoolExecutor, passwords: list) -> list:
+    return list(executor.map(utils.hash_password, passwords, chunksize=max(1, len(passwords) // (hash_workers() * 4))))
+
+
+# Insert one chunk of validated users. Rows are staged with COPY into a temporary table and moved
+# into users with a single INSERT ... ON CONFLICT DO NOTHING, so an email registered concurrently
+# is reported for its row instead of failing the chunk.
+def _copy_users(db: Session, rows: list) -> dict:
+    cursor = db.connection().connection.cursor()
+    cursor.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS users_import "
+        "(line integer, email varchar(255), password_hash varchar(255), first_name varchar(100), last_name varchar(100), role_id integer) "
+        "ON COMMIT DELETE ROWS"
+    )
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        (row["line"], row["email"], row["password_hash"], row["first_name"], row["last_name"], row["role_id"]) for row in rows
+    )
+    buffer.seek(0)
+    cursor.copy_expert("COPY users_import (line, email, password_hash, first_name, last_name, role_id) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    cursor.execute(
+        "INSERT INTO users (email, password_hash, first_name, last_name, role_id) "
+        "SELECT email, password_hash, first_name, last_name, role_id FROM users_import ORDER BY line "
+        "ON CONFLICT (email) DO NOTHING RETURNING id, email"
+    )
+    created = {email: user_id for user_id, email in cursor.fetchall()}
+    db.commit()
+    return created
+
+
+# Import users from CSV/NDJSON lines, yielding one result per row. Bad rows are reported and skipped,
+# the rest of the batch is committed chunk by chunk.
+def import_users(db: Session, lines: Iterable[str], fmt: str, chunk_size: int = None) -> Iterator[dict]:
+    chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+    role_ids = {role_id for role_id, in db.query(models.Role.id).all()}
+    seen_emails = set()
+
+    with ProcessPoolExecutor(max_workers=hash_workers()) as executor:
+        for chunk in chunked(read_records(lines, fmt), chunk_size):
+            results = []
+            valid = []
+
+            # Validate the rows and drop duplicates inside the file
+            for line, record, error in chunk:
+                if error:
+                    results.append(_row_error(line, None, error))
+                    continue
+                try:
+                    user = schemas.UserCreate(
+                        email=record.get("email"),
+                        password_hash=record.get("password") or record.get("password_hash"),
+                        first_name=record.get("first_name"),
+                        last_name=record.get("last_name"),
+                        role_id=record.get("role_id")
+                    )
+                except ValidationError as exc:
+                    results.append(_row_error(line, record.get("email"), _validation_detail(exc)))
+                    continue
+                if user.role_id not in role_ids:
+                    results.append(_row_error(line, user.email, f"Role with id={user.role_id} does not exist"))
+                elif user.email.lower() in seen_emails:
+                    results.append(_row_error(line, user.email, "Email appears more than once in the file"))
+                else:
+                    seen_emails.add(user.email.lower())
+                    valid.append((line, user))
+
+            # One set query for the emails that are already registered
+            if valid:
+                existing = {email for email, in db.query(models.User.email).filter(
+                    models.User.email.in_([user.email for _, user in valid])
+                ).all()}
+                for line, user in [item for item in valid if item[1].email in existing]:
+                    results.append(_row_error(line, user.email, "Email already registered"))
+                valid = [item for item in valid if item[1].email not in existing]
+
+            # Hash only the passwords of the rows that will be inserted, across processes
+            if valid:
+                hashes = hash_passwords(executor, [user.password_hash for _, user in valid])
+                rows = [
+                    {"line": line, "email": user.email, "password_hash": password_hash,
+                     "first_name": user.first_name, "last_name": user.last_name, "role_id": user.role_id}
+                    for (line, user), password_hash in zip(valid, hashes)
+                ]
+                created = _copy_users(db, rows)
+                for row in rows:
+                    if row["email"] in created:
+                        results.append({"line": row["line"], "email": row["email"], "status": "created", "id": created[row["email"]]})
+                    else:
+                        results.append(_row_error(row["line"], row["email"], "Email already registered"))
+
+            yield from sorted(results, key=lambda result: result["line"])
+
+
+# Check a parsed student record against the users and students resolved for the upload.
+# Returns (user_id, error); a user_id of None means the user account has to be created.
+def _resolve_student(record: schemas.StudentProvision, users_by_email: dict, taken: set):
+    if record.guardian_email in taken:
+        return None, "A student with this guardian email already exists"
+    user_id = users_by_email.get(record.guardian_email)
+    if user_id is None and not (record.password and record.first_name and record.last_name):
+        return None, "User associated with this email does not exist"
+    return user_id, None
+
+
+def _resolve_teacher(record: schemas.TeacherProvision, users_by_email: dict, user_ids: set, taken: set):
+    if record.hire_date > date.today():
+        return None, "The hire date cannot be in the future."
+    if record.hire_date < date(1970, 1, 1):
+        return None, "The hire date cannot be before '1970-01-01'."
+    if record.user_id is not None:
+        if record.user_id not in user_ids:
+            return None, f"The user with id={record.user_id} does not exist in our database"
+        user_id = record.user_id
+    elif record.email is None:
+        return None, "Either user_id or email is required"
+    else:
+        user_id = users_by_email.get(record.email)
+        if user_id is None and not (record.password and record.first_name and record.last_name):
+            return None, "User associated with this email does not exist"
+    # Users are claimed by id, or by email when the row creates the account
+    if (user_id if user_id is not None else record.email) in taken:
+        return None, "This user is already registered as a teacher."
+    return user_id, None
+
+
+# Provision students or teachers, and their user accounts where missing, from CSV/NDJSON lines,
+# yielding one result per row. Rows are processed chunk by chunk: the users and profiles referenced by
+# a chunk are resolved with one query each, its rows are inserted with multi-row INSERT ... RETURNING
+# and the chunk is committed before its results are yielded. A chunk that conflicts with a concurrent
+# registration is rolled back and its rows are reported as errors.
+def provision_profiles(db: Session, lines: Iterable[str], fmt: str, kind: str, chunk_size: int = None) -> Iterator[dict]:
+    chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+    schema = schemas.StudentProvision if kind == "student" else schemas.TeacherProvision
+    model = models.Student if kind == "student" else models.Teacher
+    role_id = STUDENT_ROLE_ID if kind == "student" else TEACHER_ROLE_ID
+
+    with ProcessPoolExecutor(max_workers=hash_workers()) as executor:
+        for chunk in chunked(read_records(lines, fmt), chunk_size):
+            results = []
+            parsed = []
+
+            for line, record, error in chunk:
+                if error:
+                    results.append(_row_error(line, None, error))
+                    continue
+                try:
+                    # Empty CSV cells mean the optional field was not given
+                    parsed.append((line, schema(**{key: value for key, value in record.items() if value != ""})))
+                except ValidationError as exc:
+                    results.append(_row_error(line, record.get("guardian_email") or record.get("email"), _validation_detail(exc)))
+
+            # Resolve every referenced user in one query, then the existing profiles in another. Rows of
+            # earlier chunks are committed, so they are found here like any other registration.
+            emails = {record.guardian_email if kind == "student" else record.email for _, record in parsed} - {None}
+            ids = {record.user_id for _, record in parsed if kind == "teacher" and record.user_id is not None}
+            users_by_email = {}
+            user_ids = set()
+            if emails or ids:
+                for user_id, email in db.query(models.User.id, models.User.email).filter(
+                    or_(models.User.email.in_(emails), models.User.id.in_(ids))
+                ):
+                    users_by_email[email] = user_id
+                    user_ids.add(user_id)
+
+            if kind == "student":
+                taken = {email for email, in db.query(models.Student.guardian_email).filter(models.Student.guardian_email.in_(emails))} if emails else set()
+            else:
+                taken = {user_id for user_id, in db.query(models.Teacher.user_id).filter(models.Teacher.user_id.in_(user_ids))} if user_ids else set()
+
+            # Validate every row against what exists and what earlier rows of the chunk claim
+            valid = []
+            for line, record in parsed:
+                email = record.guardian_email if kind == "student" else record.email
+                if kind == "student":
+                    user_id, error = _resolve_student(record, users_by_email, taken)
+                else:
+                    user_id, error = _resolve_teacher(record, users_by_email, user_ids, taken)
+                if error:
+                    results.append(_row_error(line, email, error))
+                    continue
+                taken.add(user_id if kind == "teacher" and user_id is not None else email)
+                valid.append((line, email, user_id, record))
+
+            if valid:
+                try:
+                    results.extend(_insert_profiles(db, executor, kind, model, role_id, valid, users_by_email))
+                    db.commit()
+                except IntegrityError:
+                    # Another request registered some of these users or profiles in the meantime
+                    db.rollback()
+                    results.extend(
+                        _row_error(line, email, f"The {kind} or its user was registered concurrently, please retry.")
+                        for line, email, _, _ in valid
+                    )
+
+            yield from sorted(results, key=lambda result: result["line"])
+
+
+# Create the missing user accounts of validated rows, hashing their passwords across processes,
+# then insert the profiles. Returns the results of the rows, all created.
+def _insert_profiles(db: Session, executor: ProcessPoolExecutor, kind: str, model, role_id: int, valid: list, users_by_email: dict) -> list:
+    new_users = [(email, record) for _, email, user_id, record in valid if user_id is None]
+    if new_users:
+        hashes = hash_passwords(executor, [record.password for _, record in new_users])
+        rows = [
+            {"email": email, "password_hash": password_hash, "first_name": record.first_name,
+             "last_name": record.last_name, "role_id": role_id}
+            for (email, record), password_hash in zip(new_users, hashes)
+        ]
+        for user_id, email in db.execute(insert(models.User).values(rows).returning(models.User.id, models.User.email)):
+            users_by_email[email] = user_id
+
+    if kind == "student":
+        rows = [
+            {"user_id": users_by_email[email], "date_of_birth": record.date_of_birth, "enrollment_date": record.enrollment_date,
+             "current_grade_level": record.current_grade_level, "guardian_email": email}
+            for _, email, _, record in valid
+        ]
+    else:
+        rows = [
+            {"user_id": user_id if user_id is not None else users_by_email[email], "hire_date": record.hire_date,
+             "department": record.department}
+            for _, email, user_id, record in valid
+        ]
+    profile_ids = db.execute(insert(model).values(rows).returning(model.id)).scalars().all()
+
+    # Multi-row INSERT ... RETURNING gives the ids back in the order of the VALUES list
+    return [
+        {"line": line, "email": email, "status": "created", "id": profile_id,
+         "user_id": row["user_id"], "user_created": user_id is None}
+        for (line, email, user_id, _), row, profile_id in zip(valid, rows, profile_ids)
+    ]
+
+
+# Run an import of an uploaded file and stream its results back as NDJSON, one line per row followed
+# by a summary. `run(db, lines)` is import_users or provision_profiles; `on_created(result)` is called
+# for every created row and `on_finish(summary)` once the import stops, e.g. to invalidate caches.
+# The upload and the request's session are closed before the response is streamed, so the import
+# keeps its own copy of the file and its own session.
+def stream_import(file: UploadFile, run: Callable[[Session, Iterable[str]], Iterator[dict]],
+                  on_created: Callable[[dict], None] = None, on_finish: Callable[[dict], None] = None) -> StreamingResponse:
+    upload = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    shutil.copyfileobj(file.file, upload)
+    upload.seek(0)
+
+    def results():
+        db = SessionLocal()
+        summary = {"created": 0, "error": 0}
+        try:
+            lines = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+            for result in run(db, lines):
+                summary[result["status"]] += 1
+                if on_created and result["status"] == "created":
+                    on_created(result)
+                yield json.dumps(result) + "\n"
+        finally:
+            db.close()
+            upload.close()
+            if on_finish:
+                on_finish(summary)
+        yield json.dumps({"summary": summary}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+# Run an import from the command line, printing one NDJSON result per row:
+#   python -m app.imports users.csv [--format csv|ndjson] [--kind student|teacher]
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Bulk import users, students or teachers from a CSV (with header) or NDJSON file")
+    parser.add_argument("path", help=f"File with the columns {', '.join(USER_IMPORT_COLUMNS)} when importing users")
+    parser.add_argument("--format", choices=IMPORT_FORMATS)
+    parser.add_argument("--kind", choices=PROFILE_KINDS, help="Provision students or teachers instead of plain users")
+    parser.add_argument("--chunk-size", type=int)
+    args = parser.parse_args()
+
+    summary = {"created": 0, "error": 0}
+    db = SessionLocal()
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as lines:
+            fmt = import_format(args.path, args.format)
+            if args.kind:
+                results = provision_profiles(db, lines, fmt, args.kind, args.chunk_size)
+            else:
+                results = import_users(db, lines, fmt, args.chunk_size)
+            for result in results:
+                summary[result["status"]] += 1
+                print(json.dumps(result))
+    finally:
+        db.close()
+
+    print(json.dumps({"summary": summary}), file=sys.stderr)
+    sys.exit(1 if summary["error"] else 0)
@@ -0,0 +1,114 @@
+import threading
+import time
+from . import cache, query_guard
+from .database import async_engine, engine, pool_timeouts, pool_wait_seconds
+from .metrics import Counter, Histogram, RequestStats, current_request, exposition
+
+
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+ROW_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+# Request and database metrics of one route. Routes are labelled with their path template
+# (e.g. /admin-course/{course_id}), so the number of series stays bounded.
+class RouteMetrics:
+    def __init__(self):
+        self.duration = Histogram()
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.db_seconds = Histogram()
+        self.rows = Histogram(ROW_BUCKETS)
+        self.pool_wait_seconds = Histogram()
+        self.responses = {}  # Status code -> Counter
+
+    def observe(self, status_code: int, seconds: float, stats: RequestStats):
+        self.duration.observe(seconds)
+        self.statements.observe(stats.statements)
+        self.db_seconds.observe(stats.db_seconds)
+        self.rows.observe(stats.rows)
+        self.pool_wait_seconds.observe(stats.pool_wait_seconds)
+        counter = self.responses.get(status_code) or self.responses.setdefault(status_code, Counter())
+        counter.inc()
+
+
+routes = {}  # (method, route) -> RouteMetrics
+_lock = threading.Lock()
+
+
+def route_metrics(method: str, route: str) -> RouteMetrics:
+    metrics = routes.get((method, route))
+    if metrics is None:
+        with _lock:
+            metrics = routes.setdefault((method, route), RouteMetrics())
+    return metrics
+
+
+# Pure ASGI middleware, so streamed responses are measured until their last chunk is sent. With
+# `queries` / `lazy_loads` the request's statements / lazy loads are collected for the N+1 report.
+class SQLInstrumentationMiddleware:
+    def __init__(self, app, queries: bool = False, lazy_loads: bool = False):
+        self.app = app
+        self.queries = queries
+        self.lazy_loads = lazy_loads
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(self.queries, self.lazy_loads)
+        token = current_request.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_request.reset(token)
+            # The router stores the matched route in the scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            route_metrics(scope["method"], route).observe(status_code, time.perf_counter() - started, stats)
+            if self.queries or self.lazy_loads:
+                query_guard.report.record(scope["method"], route, stats)
+
+
+# Every metric of this worker in the Prometheus text format
+def render_metrics() -> str:
+    measured = sorted(routes.items())
+    labels = lambda key: {"method": key[0], "route": key[1]}
+    pools = {"sync": engine.pool, "async": async_engine.pool}
+    caches = sorted((name, registered.stats()) for name, registered in cache.registry.items())
+
+    lines = exposition("http_requests_total", "counter", "Requests served, by route and status code", [
+        ({**labels(key), "status": code}, counter.value)
+        for key, metrics in measured for code, counter in sorted(metrics.responses.items())
+    ])
+    lines += exposition("http_request_duration_seconds", "histogram", "Time to serve a request",
+                        [(labels(key), metrics.duration) for key, metrics in measured])
+    lines += exposition("db_statements_per_request", "histogram", "SQL statements executed per request",
+                        [(labels(key), metrics.statements) for key, metrics in measured])
+    lines += exposition("db_seconds_per_request", "histogram", "Time spent executing SQL statements per request",
+                        [(labels(key), metrics.db_seconds) for key, metrics in measured])
+    lines += exposition("db_rows_per_request", "histogram", "Rows returned or affected by the SQL statements of a request, as reported by the driver",
+                        [(labels(key), metrics.rows) for key, metrics in measured])
+    lines += exposition("db_pool_wait_seconds_per_request", "histogram", "Time spent waiting for a pooled connection per request",
+                        [(labels(key), metrics.pool_wait_seconds) for key, metrics in measured])
+
+    lines += exposition("db_pool_checkout_wait_seconds", "histogram", "Time to check out a connection from the pool",
+                        [({"pool": name}, pool_wait_seconds[name]) for name in pools])
+    lines += exposition("db_pool_timeouts_total", "counter", "Checkouts that timed out waiting for a connection",
+                        [({"pool": name}, pool_timeouts[name].value) for name in pools])
+    lines += exposition("db_pool_checked_out_connections", "gauge", "Connections currently checked out",
+                        [({"pool": name}, pool.checkedout()) for name, pool in pools.items()])
+
+    lines += exposition("cache_hits_total", "counter", "Hits of the in-process caches",
+                        [({"cache": name}, stats["hits"]) for name, stats in caches])
+    lines += exposition("cache_misses_total", "counter", "Misses of the in-process caches",
+                        [({"cache": name}, stats["misses"]) for name, stats in caches])
+    lines += exposition("cache_entries", "gauge", "Entries held by the in-process caches",
+                        [({"cache": name}, stats["size"]) for name, stats in caches])
+    return "\n".join(lines) + "\n"
@@ -1,30 +1,62 @@
-from fastapi import FastAPI, APIRouter
-from . import models
-from .database import engine
-from .routers import user, student, teacher, attendance, course, enrollment, grade, oauth, student_routes, grades_routes
+import importlib
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from .config import settings
+from .serialization import FastJSONResponse
 
-# Create the database tables
-models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+# The schema is managed by Alembic (`alembic upgrade head`), so starting a worker doesn't touch the
+# database: the engines only connect on the first request and an unreachable database doesn't stop it.
+ROUTERS = (
+    "user", "student", "teacher", "attendance", "course", "enrollment", "grade", "oauth",
+    "student_routes", "grades_routes", "monitoring", "export", "analytics",
+)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from .utils import start_hash_executor
 
-app.include_router(user.router)
-app.include_router(student.router)
-app.include_router(teacher.router)
-app.include_router(attendance.router)
-app.include_router(course.router)
-app.include_router(enrollment.router)
-app.include_router(grade.router)
-app.include_router(oauth.router)
-app.include_router(student_routes.router)
-app.include_router(grades_routes.router)
+    start_hash_executor()
+    yield
 
+    # Release what the worker acquired while serving: the password hashing processes and the pooled connections
+    from .database import async_engine, engine
+    from .utils import shutdown_hash_executor
 
+    shutdown_hash_executor()
+    await async_engine.dispose()
+    engine.dispose()
 
 
+def create_app() -> FastAPI:
+    app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+    routers = ROUTERS
 
-@app.get("/")
-def root():
-    return {"message": "Database tables created successfully!"}
\ No newline at end of file
+    # N+1 detection and the lazy load guard are development aids, off by default
+    queries = settings.N_PLUS_ONE_DETECTION
+    lazy_loads = settings.LAZY_LOAD_GUARD == "warn"
+    if queries or settings.LAZY_LOAD_GUARD != "off":
+        from .database import async_engine, engine
+        from .query_guard import install
+
+        install([engine, async_engine.sync_engine])
+
+    if settings.METRICS_ENABLED or queries or lazy_loads:
+        from .instrumentation import SQLInstrumentationMiddleware
+
+        app.add_middleware(SQLInstrumentationMiddleware, queries=queries, lazy_loads=lazy_loads)
+    if settings.METRICS_ENABLED:
+        routers += ("metrics",)
+
+    for name in routers:
+        app.include_router(importlib.import_module(f".routers.{name}", __package__).router)
+
+    @app.get("/")
+    def root():
+        return {"message": "AcademyManager API is running"}
+
+    return app
+
+
+app = create_app()
@@ -0,0 +1,90 @@
+import threading
+from contextvars import ContextVar
+from typing import Optional
+
+
+# Default latency buckets in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# Cumulative histogram in the Prometheus style: each bucket counts observations <= its upper bound
+class Histogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * len(self.buckets)
+        self._count = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._count += 1
+            self._sum += value
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[index] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "buckets": {str(bound): count for bound, count in zip(self.buckets, self._counts)},
+                "count": self._count,
+                "sum": round(self._sum, 6),
+            }
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self.value += amount
+
+
+# Database work done while serving the current request. The instrumentation middleware sets a fresh
+# one per request and the engine hooks in database.py add to it; handlers running in the threadpool
+# get a copy of the context that still points to the same object. `queries` and `lazy_loads` are
+# only collected when N+1 detection (app/query_guard.py) is on.
+class RequestStats:
+    __slots__ = ("statements", "db_seconds", "rows", "pool_wait_seconds", "queries", "lazy_loads")
+
+    def __init__(self, queries: bool = False, lazy_loads: bool = False):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.pool_wait_seconds = 0.0
+        self.queries = [] if queries else None
+        self.lazy_loads = [] if lazy_loads else None
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict, **extra) -> str:
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+# One metric family in the Prometheus text format. `series` is a list of (labels, value), the value
+# being a number for counters and gauges and a Histogram for histograms.
+def exposition(name: str, kind: str, description: str, series: list) -> list:
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+    for labels, value in series:
+        if kind != "histogram":
+            lines.append(f"{name}{_labels(labels)} {value}")
+            continue
+        snapshot = value.snapshot()
+        for bound, count in snapshot["buckets"].items():
+            lines.append(f"{name}_bucket{_labels(labels, le=bound)} {count}")
+        lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {snapshot['count']}")
+        lines.append(f"{name}_sum{_labels(labels)} {snapshot['sum']}")
+        lines.append(f"{name}_count{_labels(labels)} {snapshot['count']}")
+    return lines
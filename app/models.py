@@ -1,5 +1,5 @@
 from .database import Base
-from sqlalchemy import Column, Integer, String, Boolean, func, text, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, Boolean, func, text, ForeignKey, Date, Index, Numeric, UniqueConstraint
 from sqlalchemy.sql.sqltypes import TIMESTAMP
 from sqlalchemy.orm import relationship
 
@@ -29,11 +29,11 @@ class Student(Base):
     __tablename__ = "students"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     date_of_birth = Column(Date, nullable=False)
     enrollment_date = Column(Date, nullable=False)
     current_grade_level = Column(Integer, nullable=False)
-    guardian_email = Column(String(255), nullable=False)
+    guardian_email = Column(String(255), nullable=False, index=True)
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"))
     updated_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"), onupdate=text("NOW()"))
 
@@ -44,7 +44,7 @@ class Teacher(Base):
     __tablename__ = "teachers"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     hire_date = Column(Date, nullable=False)
     department = Column(String(100), nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"))
@@ -60,17 +60,22 @@ class Course(Base):
     course_name = Column(String(255), nullable=False)
     course_code = Column(Integer, unique=True, nullable=False)
     description = Column(String(255), nullable=True)
-    teacher_id  = Column(Integer, ForeignKey('teachers.id'), nullable=False) 
+    teacher_id  = Column(Integer, ForeignKey('teachers.id'), nullable=False, index=True) 
 
     teacher = relationship('Teacher')
 
 class StudentCourse(Base):
     __tablename__ = "student_courses"
+    # A student is enrolled once per course and teacher; the constraint's index also serves course
+    # rosters, enrollment duplicate checks and teacher assignment checks
+    __table_args__ = (
+        UniqueConstraint('course_id', 'teacher_id', 'student_id', name='uq_student_courses_course_id_teacher_id_student_id'),
+    )
 
     id = Column(Integer, primary_key=True)
-    student_id = Column(Integer, ForeignKey('students.id', ondelete='CASCADE'), nullable=False)
+    student_id = Column(Integer, ForeignKey('students.id', ondelete='CASCADE'), nullable=False, index=True)
     course_id  = Column(Integer, ForeignKey('courses.id', ondelete='CASCADE'), nullable=False)
-    teacher_id  = Column(Integer, ForeignKey('teachers.id', ondelete='CASCADE'), nullable=False)
+    teacher_id  = Column(Integer, ForeignKey('teachers.id', ondelete='CASCADE'), nullable=False, index=True)
     enrollment_date = Column(Date, nullable=False)
 
     student = relationship('Student')
@@ -79,18 +84,46 @@ class StudentCourse(Base):
 
 class Attendance(Base):
     __tablename__ = "attendance"
+    # One record per student, course and session date. The table is range partitioned
+    # by month on attendance_date (see the Alembic migrations and app/partitions.py)
+    __table_args__ = (
+        Index('ix_attendance_course_id_attendance_date_student_id', 'course_id', 'attendance_date', 'student_id', unique=True),
+        Index('ix_attendance_course_id_status', 'course_id', 'status'),
+        Index('ix_attendance_student_id_attendance_date', 'student_id', 'attendance_date'),
+    )
 
     id = Column(Integer, primary_key=True)
     student_id = Column(Integer, ForeignKey('students.id', ondelete='CASCADE'), nullable=False)
     course_id  = Column(Integer, ForeignKey('courses.id', ondelete='CASCADE'), nullable=False)
-    attendance_date = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"))
+    attendance_date = Column(Date, nullable=False, server_default=text("CURRENT_DATE"))
     status = Column(String(20), nullable=False, default='Present')
 
     student = relationship("Student")
     course = relationship("Course")
 
+# Attendance counts per student, course and week (weeks start on Monday), kept up to date by the
+# attendance endpoints through app/rollups.py so analytics never scan `attendance`
+class AttendanceWeeklySummary(Base):
+    __tablename__ = "attendance_weekly_summary"
+    __table_args__ = (
+        Index('ix_attendance_weekly_summary_week_start_course_id', 'week_start', 'course_id'),
+    )
+
+    student_id = Column(Integer, ForeignKey('students.id', ondelete='CASCADE'), primary_key=True)
+    course_id = Column(Integer, ForeignKey('courses.id', ondelete='CASCADE'), primary_key=True)
+    week_start = Column(Date, primary_key=True)
+    present = Column(Integer, nullable=False, server_default=text('0'))
+    absent = Column(Integer, nullable=False, server_default=text('0'))
+    excused = Column(Integer, nullable=False, server_default=text('0'))
+    late = Column(Integer, nullable=False, server_default=text('0'))
+    total = Column(Integer, nullable=False, server_default=text('0'))  # Every session, whatever its status
+
 class Grade(Base):
     __tablename__ = "grades"
+    __table_args__ = (
+        Index('ix_grades_student_id_course_id', 'student_id', 'course_id'),
+        Index('ix_grades_course_id', 'course_id'),
+    )
 
     id = Column(Integer, primary_key=True)
     student_id = Column(Integer, ForeignKey('students.id', ondelete='CASCADE'), nullable=False)
@@ -99,3 +132,23 @@ class Grade(Base):
     comments   = Column(String(255), nullable=True)
     graded_at  = Column(TIMESTAMP(timezone=True), server_default=text('NOW()'))
 
+
+# GPA points per student and term (see app/transcripts.py), kept up to date by the grade endpoints
+# so transcripts are read from here instead of recomputed from every grade
+class StudentTermGPA(Base):
+    __tablename__ = "student_term_gpa"
+
+    student_id = Column(Integer, ForeignKey('students.id', ondelete='CASCADE'), primary_key=True)
+    term_start = Column(Date, primary_key=True)
+    points = Column(Numeric(10, 2), nullable=False, server_default=text('0'))
+    graded_courses = Column(Integer, nullable=False, server_default=text('0'))  # Grades with a point value
+
+
+# Refresh tokens that were rotated or logged out, kept until they would have expired anyway
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False, index=True)
+    revoked_at = Column(TIMESTAMP(timezone=True), server_default=text('NOW()'))
@@ -1,56 +1,93 @@
+import hashlib
+import time
+import uuid
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from . import schemas
+from .cache import TTLCache
+from .config import settings
 from fastapi import HTTPException, Depends, status
 from fastapi.security import OAuth2PasswordBearer
-import os
-from dotenv import load_dotenv
 # OAuth2PasswordBearer provides a URL for obtaining a token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='login')
 
-# .env file
-load_dotenv()
+SECRET_KEY = settings.SECRET_KEY
+ALGORITHM = settings.ALGORITHM
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
 
-
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+# Tokens whose signature was already checked, keyed by the token's hash until the token expires
+verified_tokens = TTLCache("verified_tokens", maxsize=settings.TOKEN_CACHE_MAX_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
 
 
 # Function to create an access token
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "type": "access"})
     
     # Encode the JWT token with secret and algorithm
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Function to create a long-lived refresh token, its jti identifies it in the revocation list
+def create_refresh_token(data: dict):
+    to_encode = data.copy()
+    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid.uuid4().hex})
+
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+# Function to verify a refresh token, returns its payload (user_id, jti, exp)
+def verify_refresh_token(token: str, credentials_exception) -> dict:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise credentials_exception
+
+    if payload.get("type") != "refresh" or payload.get("user_id") is None or payload.get("jti") is None:
+        raise credentials_exception
+
+    return payload
+
 # Function to verify access token
 def verify_access_token(token: str, credentials_exception):
     try:
         # Remove "Bearer " prefix if it exists
         if token.startswith("Bearer "):
             token = token[len("Bearer "):]
+
+        # Skip the signature check for tokens already verified by this worker
+        token_key = hashlib.sha256(token.encode()).digest()
+        token_data = verified_tokens.get(token_key)
+        if token_data is not None:
+            return token_data
         
         # Decode the JWT token
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
+        # Refresh tokens can't be used to call the API
+        if payload.get('type') == 'refresh':
+            raise credentials_exception
+
         user_id: str = str(payload.get('user_id'))
         role_id: str = str(payload.get('role_id'))
 
         if user_id is None or role_id is None:
             raise credentials_exception
         
-        # Return token data (user_id, role_id)
-        return schemas.TokenData(id=user_id, role_id=role_id)
+        # Return token data (user_id, role_id), cached until the token expires
+        token_data = schemas.TokenData(id=user_id, role_id=role_id)
+        remaining = payload['exp'] - time.time() if 'exp' in payload else None
+        if remaining is None or remaining > 0:
+            verified_tokens.set(token_key, token_data, ttl=remaining)
+        return token_data
 
     except JWTError:
         raise credentials_exception
 
-# Function to fetch the current user
-def get_current_user(token: str = Depends(oauth2_scheme)):
+# Function to fetch the current user, async so it is resolved on the event loop
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED, 
         detail="Could not validate credentials", 
@@ -0,0 +1,96 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Optional
+from fastapi import HTTPException, Query, status
+from sqlalchemy import tuple_
+from sqlalchemy.engine import Row
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+# Query parameters shared by every list endpoint
+class PageParams:
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="Opaque cursor returned by the previous page"),
+        sort: str = Query("id", description="Sort key, prefix with '-' for descending order"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.sort = sort
+
+
+def _invalid_cursor():
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+
+
+# The cursor carries the sort key it was issued for, so it can't be replayed with another sort
+def encode_cursor(sort: str, values: list) -> str:
+    payload = {"s": sort, "v": [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, columns: list) -> list:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = payload["v"]
+        if payload["s"] != sort or len(values) != len(columns):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        raise _invalid_cursor()
+
+    # Restore dates from their ISO format so they compare correctly in SQL
+    decoded = []
+    for column, value in zip(columns, values):
+        python_type = column.type.python_type
+        try:
+            if python_type is date:
+                value = date.fromisoformat(value)
+            elif python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is int:
+                value = int(value)
+        except (ValueError, TypeError):
+            raise _invalid_cursor()
+        decoded.append(value)
+    return decoded
+
+
+# Apply keyset pagination to a query and return (rows, next_cursor).
+# `sort_keys` maps the public sort names to non-nullable columns of `model`; the primary key
+# is always appended as a tie-breaker so the ordering is total.
+def paginate(query, model, sort_keys: dict, params: PageParams):
+    descending = params.sort.startswith("-")
+    sort_name = params.sort.lstrip("-")
+
+    if sort_name not in sort_keys:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid sort key '{sort_name}'. Allowed keys: {', '.join(sort_keys)}"
+        )
+
+    columns = [sort_keys[sort_name]]
+    if sort_keys[sort_name] is not model.id:
+        columns.append(model.id)
+
+    if params.cursor:
+        values = decode_cursor(params.cursor, params.sort, columns)
+        key, last = (columns[0], values[0]) if len(columns) == 1 else (tuple_(*columns), tuple_(*values))
+        query = query.filter(key < last if descending else key > last)
+
+    ordering = [column.desc() if descending else column.asc() for column in columns]
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(*ordering).limit(params.limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > params.limit:
+        rows = rows[:params.limit]
+        last_row = rows[-1][0] if isinstance(rows[-1], Row) else rows[-1]
+        next_cursor = encode_cursor(params.sort, [getattr(last_row, column.key) for column in columns])
+
+    return rows, next_cursor
@@ -0,0 +1,51 @@
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+
+# Number of monthly attendance partitions kept ahead of the current month
+MONTHS_AHEAD = 12
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def attendance_partition_name(month: date) -> str:
+    return f"attendance_y{month.year}m{month.month:02d}"
+
+
+# Create the monthly partitions of `attendance` from `start` up to `months_ahead` months after today.
+# Partitions that already exist are left untouched.
+def ensure_attendance_partitions(connection: Connection, start: date = None, months_ahead: int = MONTHS_AHEAD) -> list:
+    month = month_start(start or date.today())
+    last = month_start(date.today())
+    for _ in range(months_ahead):
+        last = next_month(last)
+
+    created = []
+    while month <= last:
+        name = attendance_partition_name(month)
+        exists = connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+        if not exists:
+            connection.execute(text(
+                f"CREATE TABLE {name} PARTITION OF attendance "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+            ))
+            created.append(name)
+        month = next_month(month)
+    return created
+
+
+# Run periodically (e.g. from cron) so roll call never lands in the default partition:
+#   python -m app.partitions
+if __name__ == "__main__":
+    from .database import engine
+
+    with engine.begin() as connection:
+        for name in ensure_attendance_partitions(connection):
+            print(f"Created partition {name}")
@@ -0,0 +1,134 @@
+import logging
+import os
+import re
+import sys
+import threading
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import Session
+from .config import settings
+from .metrics import RequestStats, current_request
+
+
+logger = logging.getLogger(__name__)
+
+# Development aid for tests and staging (see N_PLUS_ONE_DETECTION and LAZY_LOAD_GUARD in config.py):
+# the statements and lazy relationship loads of each request are collected with the code that
+# issued them, and statements repeated within one request are reported per route.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+# Frames of the instrumentation itself are never the call site
+IGNORED_FILES = {os.path.join(APP_DIR, name) for name in ("query_guard.py", "instrumentation.py", "database.py")}
+
+# Expanded IN lists differ in length from one request to the next
+IN_LIST = re.compile(r"\bIN \([^()]*\)", re.IGNORECASE)
+WHITESPACE = re.compile(r"\s+")
+
+
+# Statements with the same shape only differ in their bound parameters
+def statement_shape(statement: str) -> str:
+    return IN_LIST.sub("IN (...)", WHITESPACE.sub(" ", statement).strip())
+
+
+# The innermost frame of the application that led here, e.g. "routers/attendance.py:272 in get_attendance_by_course".
+# Async handlers reach the database from a greenlet, so the walk continues in the greenlet that spawned it.
+def call_site() -> str:
+    frame = sys._getframe(1)
+    current = greenlet.getcurrent()
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and filename not in IGNORED_FILES:
+            return f"{filename[len(APP_DIR):]}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+        if frame is None and current.parent is not None:
+            current = current.parent
+            frame = current.gr_frame
+    return "unknown"
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    if stats is not None and stats.queries is not None:
+        stats.queries.append((statement_shape(statement), call_site()))
+
+
+# Lazy loads are the ORM executions made on behalf of an instance; those answered from the session
+# (e.g. a many-to-one already loaded) never get here, nor do joinedload/selectinload
+def _do_orm_execute(orm_execute_state):
+    if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+        return
+
+    relationship = orm_execute_state.loader_strategy_path.path[-1]
+    name = f"{relationship.parent.class_.__name__}.{relationship.key}"
+    if settings.LAZY_LOAD_GUARD == "raise":
+        raise InvalidRequestError(f"Unplanned lazy load of {name} at {call_site()}, load it with the query (e.g. joinedload)")
+
+    stats = current_request.get()
+    if stats is not None and stats.lazy_loads is not None:
+        stats.lazy_loads.append((name, call_site()))
+
+
+# N+1 findings of this worker, per route
+class QueryReport:
+    def __init__(self):
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, route: str, stats: RequestStats):
+        repeated = {}
+        for shape, site in stats.queries or ():
+            repeated.setdefault(shape, []).append(site)
+        repeated = {shape: sites for shape, sites in repeated.items() if len(sites) >= settings.N_PLUS_ONE_THRESHOLD}
+        if not repeated and not stats.lazy_loads:
+            return
+
+        with self._lock:
+            report = self.routes.setdefault(f"{method} {route}", {"requests_flagged": 0, "repeated_statements": {}, "lazy_loads": {}})
+            report["requests_flagged"] += 1
+            for shape, sites in repeated.items():
+                finding = report["repeated_statements"].setdefault(shape, {"requests": 0, "max_repeats": 0, "call_sites": {}})
+                finding["requests"] += 1
+                finding["max_repeats"] = max(finding["max_repeats"], len(sites))
+                for site in sites:
+                    finding["call_sites"][site] = finding["call_sites"].get(site, 0) + 1
+            for relationship, site in stats.lazy_loads or ():
+                finding = report["lazy_loads"].setdefault(relationship, {"count": 0, "call_sites": {}})
+                finding["count"] += 1
+                finding["call_sites"][site] = finding["call_sites"].get(site, 0) + 1
+
+        for shape, sites in repeated.items():
+            logger.warning("n_plus_one route=%s %s repeats=%s call_site=%s statement=%s",
+                           method, route, len(sites), max(set(sites), key=sites.count), shape[:200])
+        for relationship, site in stats.lazy_loads or ():
+            logger.warning("lazy_load route=%s %s relationship=%s call_site=%s", method, route, relationship, site)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                route: {
+                    "requests_flagged": report["requests_flagged"],
+                    "repeated_statements": [
+                        {"statement": shape, **finding, "call_sites": dict(finding["call_sites"])}
+                        for shape, finding in sorted(report["repeated_statements"].items(), key=lambda item: -item[1]["max_repeats"])
+                    ],
+                    "lazy_loads": {
+                        relationship: {**finding, "call_sites": dict(finding["call_sites"])}
+                        for relationship, finding in report["lazy_loads"].items()
+                    },
+                }
+                for route, report in self.routes.items()
+            }
+
+
+report = QueryReport()
+
+
+# Hook into the engines and every ORM session; called by create_app when either feature is on
+def install(engines: list):
+    if settings.N_PLUS_ONE_DETECTION:
+        for instrumented in engines:
+            if not event.contains(instrumented, "after_cursor_execute", _after_cursor_execute):
+                event.listen(instrumented, "after_cursor_execute", _after_cursor_execute)
+    if settings.LAZY_LOAD_GUARD in ("warn", "raise") and not event.contains(Session, "do_orm_execute", _do_orm_execute):
+        event.listen(Session, "do_orm_execute", _do_orm_execute)
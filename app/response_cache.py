@@ -0,0 +1,156 @@
+import hashlib
+import threading
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.responses import Response
+from . import oauth2, schemas
+from .cache import TTLCache
+from .config import settings
+from .serialization import FastJSONResponse
+
+
+# Entries are (etag, status_code, body). Every cached route is keyed by its URL and the caller,
+# plus the current version of each namespace it reads from; the write endpoints bump those versions,
+# so a stale entry is never looked up again and simply ages out.
+
+
+# Per worker cache; a version bump only reaches the worker that handled the write, the others
+# serve their entry until RESPONSE_CACHE_TTL_SECONDS runs out
+class MemoryBackend:
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache("responses", maxsize=maxsize, ttl=ttl)
+        self.versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[tuple]:
+        return self.entries.get(key)
+
+    def set(self, key: str, entry: tuple):
+        self.entries.set(key, entry)
+
+    def get_versions(self, namespaces: list) -> list:
+        with self._lock:
+            return [self.versions.get(namespace, 0) for namespace in namespaces]
+
+    def bump(self, namespaces: list):
+        with self._lock:
+            for namespace in namespaces:
+                self.versions[namespace] = self.versions.get(namespace, 0) + 1
+
+
+# Shared by all workers through Redis (or any server speaking its protocol), so a write invalidates
+# everywhere at once. Needs the `redis` package.
+class RedisBackend:
+    def __init__(self, url: str, ttl: float):
+        import redis  # Optional dependency, only imported when this backend is configured
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = int(ttl)
+
+    def get(self, key: str) -> Optional[tuple]:
+        raw = self.client.get(f"response:{key}")
+        if raw is None:
+            return None
+        etag, status_code, body = raw.split(b"\n", 2)
+        return etag.decode(), int(status_code), body
+
+    def set(self, key: str, entry: tuple):
+        etag, status_code, body = entry
+        self.client.set(f"response:{key}", f"{etag}\n{status_code}\n".encode() + body, ex=self.ttl)
+
+    def get_versions(self, namespaces: list) -> list:
+        return [int(version or 0) for version in self.client.mget([f"version:{namespace}" for namespace in namespaces])]
+
+    def bump(self, namespaces: list):
+        pipeline = self.client.pipeline()
+        for namespace in namespaces:
+            pipeline.incr(f"version:{namespace}")
+        pipeline.execute()
+
+
+def make_backend():
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        return RedisBackend(settings.RESPONSE_CACHE_REDIS_URL, settings.RESPONSE_CACHE_TTL_SECONDS)
+    if settings.RESPONSE_CACHE_BACKEND == "memory":
+        return MemoryBackend(settings.RESPONSE_CACHE_MAX_SIZE, settings.RESPONSE_CACHE_TTL_SECONDS)
+    return None
+
+
+backend = make_backend()
+
+# Clients have to revalidate every time, which costs them a 304 at most
+CACHE_HEADERS = {"Cache-Control": "private, no-cache"}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+# Handed to the route: a hit is returned as is, otherwise the route builds its content and stores it
+class CachedResponse:
+    def __init__(self, key: Optional[str], status_code: int, if_none_match: Optional[str], entry: Optional[tuple]):
+        self.key = key
+        self.status_code = status_code
+        self.if_none_match = if_none_match
+        self.entry = entry
+
+    @property
+    def hit(self) -> bool:
+        return self.entry is not None
+
+    @property
+    def response(self) -> Response:
+        etag, status_code, body = self.entry
+        return Response(body, status_code=status_code, media_type="application/json", headers={"ETag": etag, **CACHE_HEADERS})
+
+    def store(self, content) -> Response:
+        response = FastJSONResponse(content, status_code=self.status_code)
+        if self.key is None:
+            return response
+
+        etag = f'"{hashlib.sha256(response.body).hexdigest()}"'
+        backend.set(self.key, (etag, self.status_code, response.body))
+        if etag_matches(self.if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, **CACHE_HEADERS})
+        response.headers.update({"ETag": etag, **CACHE_HEADERS})
+        return response
+
+
+def _no_scope():
+    return None
+
+
+# Build the dependency of a cached route. `namespaces` are the data the route reads; `scoped`
+# namespaces are suffixed with the value of the `scope` dependency (e.g. the caller's student id),
+# so a write only invalidates the responses of the student it touched.
+def cached_response(*namespaces: str, scoped: tuple = (), scope=_no_scope):
+
+    def dependency(request: Request, current_user: schemas.TokenData = Depends(oauth2.get_current_user),
+                   scope_id = Depends(scope)) -> CachedResponse:
+        status_code = getattr(request.scope.get("route"), "status_code", None) or status.HTTP_200_OK
+        if_none_match = request.headers.get("if-none-match")
+        if backend is None:
+            return CachedResponse(None, status_code, if_none_match, None)
+
+        keys = list(namespaces) + [f"{namespace}:{scope_id}" for namespace in scoped]
+        versions = backend.get_versions(keys)
+        key = hashlib.sha256("|".join([
+            request.url.path, request.url.query, str(current_user.id), str(current_user.role_id),
+            *(f"{namespace}={version}" for namespace, version in zip(keys, versions))
+        ]).encode()).hexdigest()
+
+        entry = backend.get(key)
+        if entry is not None and etag_matches(if_none_match, entry[0]):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": entry[0], **CACHE_HEADERS})
+        return CachedResponse(key, status_code, if_none_match, entry)
+
+    return dependency
+
+
+# Called by the write endpoints after their commit
+def bump(*namespaces: str):
+    if backend is not None:
+        backend.bump(list(namespaces))
@@ -0,0 +1,97 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Iterable
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from . import models
+
+
+# Statuses counted in their own column; any other status only counts towards `total`
+ROLLUP_STATUSES = ('present', 'absent', 'excused', 'late')
+COUNT_COLUMNS = ROLLUP_STATUSES + ('total',)
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+# Apply attendance changes to the weekly summary in the caller's transaction. Each change is
+# (student_id, course_id, attendance_date, status, delta): +1 for a new record, -1 for a removed one,
+# and a pair of both for a status change. Changes are merged per week first, since one multi-row
+# INSERT ... ON CONFLICT DO UPDATE can't touch the same summary row twice.
+def apply_attendance_changes(db: Session, changes: Iterable[tuple]):
+    deltas = defaultdict(lambda: dict.fromkeys(COUNT_COLUMNS, 0))
+    for student_id, course_id, attendance_date, status, delta in changes:
+        counts = deltas[(student_id, course_id, week_start(attendance_date))]
+        counts['total'] += delta
+        if status and status.lower() in ROLLUP_STATUSES:
+            counts[status.lower()] += delta
+
+    rows = [
+        {"student_id": student_id, "course_id": course_id, "week_start": week, **counts}
+        for (student_id, course_id, week), counts in deltas.items()
+        if any(counts.values())
+    ]
+    if not rows:
+        return
+
+    summary = models.AttendanceWeeklySummary.__table__
+    statement = insert(summary).values(rows)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=['student_id', 'course_id', 'week_start'],
+        set_={column: summary.c[column] + statement.excluded[column] for column in COUNT_COLUMNS}
+    ))
+
+
+def record_attendance(db: Session, records: Iterable):
+    apply_attendance_changes(db, (
+        (record.student_id, record.course_id, record.attendance_date, record.status, 1) for record in records
+    ))
+
+
+def change_attendance_status(db: Session, record, old_status: str):
+    apply_attendance_changes(db, [
+        (record.student_id, record.course_id, record.attendance_date, old_status, -1),
+        (record.student_id, record.course_id, record.attendance_date, record.status, 1),
+    ])
+
+
+# Recompute the summary from `attendance` for the weeks between start and end (all weeks by default).
+# Used to repair the rollup after attendance was changed outside the API.
+def rebuild_attendance_summary(connection: Connection, start: date = None, end: date = None):
+    start = week_start(start) if start else date.min
+    end = week_start(end) + timedelta(days=7) if end else date.max
+    params = {"start": start, "end": end}
+
+    connection.execute(text(
+        "DELETE FROM attendance_weekly_summary WHERE week_start >= :start AND week_start < :end"
+    ), params)
+    connection.execute(text("""
+        INSERT INTO attendance_weekly_summary (student_id, course_id, week_start, present, absent, excused, late, total)
+        SELECT student_id, course_id, date_trunc('week', attendance_date)::date,
+               count(*) FILTER (WHERE lower(status) = 'present'),
+               count(*) FILTER (WHERE lower(status) = 'absent'),
+               count(*) FILTER (WHERE lower(status) = 'excused'),
+               count(*) FILTER (WHERE lower(status) = 'late'),
+               count(*)
+        FROM attendance
+        WHERE attendance_date >= :start AND attendance_date < :end
+        GROUP BY 1, 2, 3
+    """), params)
+
+
+# Rebuild the rollup, e.g. after a manual data fix:
+#   python -m app.rollups [--start 2024-09-01] [--end 2025-06-30]
+if __name__ == "__main__":
+    import argparse
+    from .database import engine
+
+    parser = argparse.ArgumentParser(description="Rebuild attendance_weekly_summary from attendance")
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        rebuild_attendance_summary(connection, args.start, args.end)
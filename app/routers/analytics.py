@@ -0,0 +1,110 @@
+from datetime import date, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.orm import Session
+from .. import models, schemas
+from ..database import get_db
+from ..rollups import week_start
+from .dependencies import is_admin
+
+
+router = APIRouter(
+    prefix='/admin/attendance-analytics',
+    tags=['Attendance Analytics']
+)
+
+# Weeks covered when no start date is given, the current week included
+DEFAULT_WEEKS = 4
+
+
+# Snap the requested range to whole weeks of the rollup
+def week_range(start_date: Optional[date], end_date: Optional[date]) -> tuple:
+    end = week_start(end_date or date.today())
+    start = week_start(start_date) if start_date else end - timedelta(weeks=DEFAULT_WEEKS - 1)
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The start date should not be after the end date")
+    return start, end
+
+
+# Absence rate per student (or per student and course) over the summary rows of the range
+def absence_rates(db: Session, start: date, end: date, course_id: Optional[int], per_course: bool,
+                  min_sessions: int, threshold: float = None, limit: int = None) -> list:
+    summary = models.AttendanceWeeklySummary
+    group = [summary.student_id, summary.course_id] if per_course else [summary.student_id]
+    sessions = func.sum(summary.total)
+    absent = func.sum(summary.absent)
+    rate = cast(absent, Float) / func.nullif(sessions, 0)
+
+    rates = select(
+        *group,
+        sessions.label("sessions"),
+        absent.label("absent"),
+        func.sum(summary.late).label("late"),
+        func.sum(summary.excused).label("excused"),
+        rate.label("absence_rate")
+    ).where(
+        summary.week_start >= start,
+        summary.week_start <= end
+    ).group_by(*group).having(sessions >= min_sessions)
+
+    if course_id is not None:
+        rates = rates.where(summary.course_id == course_id)
+    if threshold is not None:
+        rates = rates.having(rate >= threshold)
+    rates = rates.subquery()
+
+    query = select(rates, models.User.first_name, models.User.last_name, models.User.email) \
+        .join(models.Student, models.Student.id == rates.c.student_id) \
+        .join(models.User, models.User.id == models.Student.user_id) \
+        .order_by(rates.c.absence_rate.desc(), rates.c.absent.desc(), rates.c.student_id)
+    if limit:
+        query = query.limit(limit)
+
+    return [
+        schemas.AbsenceRate(
+            student_id=row.student_id,
+            first_name=row.first_name,
+            last_name=row.last_name,
+            email=row.email,
+            course_id=row.course_id if per_course else course_id,
+            sessions=row.sessions,
+            absent=row.absent,
+            late=row.late,
+            excused=row.excused,
+            absence_rate=round(row.absence_rate, 4)
+        )
+        for row in db.execute(query)
+    ]
+
+
+# Students with the highest absence rate, across all courses or within one
+@router.get('/leaderboard', status_code=status.HTTP_200_OK, response_model=schemas.AbsenceLeaderboard)
+def get_absence_leaderboard(course_id: Optional[int] = None, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                            limit: int = Query(20, ge=1, le=200), min_sessions: int = Query(1, ge=1),
+                            db: Session = Depends(get_db), admin_id = Depends(is_admin)):
+
+    start, end = week_range(start_date, end_date)
+    return schemas.AbsenceLeaderboard(
+        start_date=start,
+        end_date=end + timedelta(days=6),
+        course_id=course_id,
+        students=absence_rates(db, start, end, course_id, per_course=False, min_sessions=min_sessions, limit=limit)
+    )
+
+
+# Students whose absence rate in a course reached the threshold (chronic absence)
+@router.get('/alerts', status_code=status.HTTP_200_OK, response_model=schemas.AbsenceAlerts)
+def get_absence_alerts(threshold: float = Query(0.1, gt=0, le=1), course_id: Optional[int] = None,
+                       start_date: Optional[date] = None, end_date: Optional[date] = None, min_sessions: int = Query(5, ge=1),
+                       db: Session = Depends(get_db), admin_id = Depends(is_admin)):
+
+    start, end = week_range(start_date, end_date)
+    alerts = absence_rates(db, start, end, course_id, per_course=True, min_sessions=min_sessions, threshold=threshold)
+    return schemas.AbsenceAlerts(
+        threshold=threshold,
+        start_date=start,
+        end_date=end + timedelta(days=6),
+        total=len(alerts),
+        alerts=alerts
+    )
@@ -1,10 +1,15 @@
 from typing import List, Optional
 from fastapi import FastAPI, Response, HTTPException, status, APIRouter, Depends, Query
-from sqlalchemy import func
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
 from ..database import get_db
 from sqlalchemy.orm import Session
 from .. import models, schemas
-from .dependencies import is_teacher, teacher_verify_course
+from ..assignments import assignments
+from ..rollups import change_attendance_status, record_attendance
+from ..response_cache import bump
+from ..serialization import FastJSONResponse
+from .dependencies import is_teacher, teacher_verify_course, get_teacher_id
 from datetime import date
 
 router = APIRouter(
@@ -12,41 +17,73 @@ router = APIRouter(
     tags=['Attendance']
 )
 
+# Accepted attendance statuses, stored lowercase
+ATTENDANCE_STATUSES = ['absent', 'present', 'excused', 'late']
+INVALID_STATUS = "Invalid status. Status can only be 'absent', 'present', 'excused', or 'late'."
+
+
+# Lowercase a requested status, None when it isn't one of ATTENDANCE_STATUSES
+def normalize_status(value: Optional[str]) -> Optional[str]:
+    if value and value.lower() in ATTENDANCE_STATUSES:
+        return value.lower()
+    return None
+
+
+# Same as normalize_status, for the routes that handle a single record
+def validate_status(value: Optional[str]) -> str:
+    normalized = normalize_status(value)
+    if normalized is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=INVALID_STATUS)
+    return normalized
+
+
+# Attendance is kept per session date; default to today and refuse future sessions
+def validate_session_date(attendance_date: Optional[date]) -> date:
+    if attendance_date is None:
+        return date.today()
+    if attendance_date > date.today():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The attendance date should not be in the future")
+    return attendance_date
+
 
 
 @router.post('/', status_code=status.HTTP_201_CREATED, response_model=schemas.AttendanceResponse)
 def create_attendance(user: schemas.AttendanceRequest, db: Session = Depends(get_db), teacher_id = Depends(is_teacher)):
-    
-    # Fetch teacher_id from user_id
-    teacher = db.query(models.Teacher).filter(models.Teacher.user_id == teacher_id).first()
-    
-    if not teacher:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No teacher found with user_id={teacher_id}")
-
 
     # Verify if the teacher is assigned to the student and course
     teacher_verify_course(teacher_id, user.student_id, user.course_id, db)
 
+    session_date = validate_session_date(user.attendance_date)
+    attendance_status = validate_status(user.status)
 
-    # Check if the attendance record already exists
+    # Check if the attendance record already exists for this session
     existing_attendance = db.query(models.Attendance).filter(
-        models.Attendance.student_id == user.student_id,
-        models.Attendance.course_id == user.course_id
+        models.Attendance.course_id == user.course_id,
+        models.Attendance.attendance_date == session_date,
+        models.Attendance.student_id == user.student_id
     ).first()
 
     if existing_attendance:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Attendance record for student {user.student_id} in course {user.course_id} already exists.")
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Attendance record for student {user.student_id} in course {user.course_id} on {session_date} already exists.")
 
     # Create new attendance record
     new_attendance = models.Attendance(
         student_id=user.student_id,
         course_id=user.course_id,
-        status=user.status
+        attendance_date=session_date,
+        status=attendance_status
     )
 
     db.add(new_attendance)
-    db.commit()
+    try:
+        record_attendance(db, [new_attendance])
+        db.commit()
+    except IntegrityError:
+        # Another request recorded this session in the meantime
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Attendance record for student {user.student_id} in course {user.course_id} on {session_date} already exists.")
     db.refresh(new_attendance)
+    bump(f"attendance:{new_attendance.student_id}")
 
     # Fetch the student's details for response
     student = db.query(models.Student).filter(models.Student.id == new_attendance.student_id).first()
@@ -60,51 +97,134 @@ def create_attendance(user: schemas.AttendanceRequest, db: Session = Depends(get
         last_name=user_info.last_name,
         email=user_info.email,
         course_id=new_attendance.course_id,
-        attendance_date=new_attendance.attendance_date.date() if new_attendance.attendance_date else date.today(),
+        attendance_date=new_attendance.attendance_date,
         status=new_attendance.status
     )
 
 
 
-@router.put('/', status_code=status.HTTP_200_OK, response_model=schemas.AttendanceResponse)
-def update_attendance(user: schemas.AttendanceRequest, db: Session = Depends(get_db), teacher_id = Depends(is_teacher)):
-    # Step 1: Get the teacher_id based on user_id
-    teacher = db.query(models.Teacher).filter(models.Teacher.user_id == teacher_id).first()
+# Take roll for a whole class in one request
+@router.post('/bulk', status_code=status.HTTP_201_CREATED, response_model=schemas.BulkAttendanceResponse)
+def create_bulk_attendance(roll_call: schemas.BulkAttendanceRequest, db: Session = Depends(get_db), teacher_id = Depends(is_teacher)):
 
-    if not teacher:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"No teacher found with user_id {teacher_id}."
-        )
+    # Fetch teacher_id from user_id
+    teacher = get_teacher_id(teacher_id, db)
+
+    session_date = validate_session_date(roll_call.attendance_date)
+    student_ids = {record.student_id for record in roll_call.records}
+
+    # Students this teacher is assigned to in the course, checked once for the whole roll
+    assigned = assignments.assigned_students(teacher, roll_call.course_id, db, student_ids) & student_ids
+
+    # Students that already have an attendance record in the course for this session
+    recorded = {row.student_id for row in db.query(models.Attendance.student_id).filter(
+        models.Attendance.course_id == roll_call.course_id,
+        models.Attendance.attendance_date == session_date,
+        models.Attendance.student_id.in_(assigned)
+    )} if assigned else set()
+
+    # Validate every row, collecting errors instead of failing the whole roll
+    rows = []
+    errors = []
+    seen = set()
+    for record in roll_call.records:
+        attendance_status = normalize_status(record.status)
+        if record.student_id in seen:
+            detail = f"Student {record.student_id} appears more than once in the request."
+        elif record.student_id not in assigned:
+            detail = f"Teacher with user_id {teacher_id} (teacher_id {teacher}) is not assigned to student {record.student_id} for course {roll_call.course_id}."
+        elif record.student_id in recorded:
+            detail = f"Attendance record for student {record.student_id} in course {roll_call.course_id} on {session_date} already exists."
+        elif attendance_status is None:
+            detail = INVALID_STATUS
+        else:
+            detail = None
+
+        seen.add(record.student_id)
+        if detail:
+            errors.append(schemas.BulkAttendanceError(student_id=record.student_id, detail=detail))
+        else:
+            rows.append({
+                "student_id": record.student_id,
+                "course_id": roll_call.course_id,
+                "attendance_date": session_date,
+                "status": attendance_status
+            })
+
+    # Insert all valid rows with a single multi-row INSERT
+    created = []
+    if rows:
+        try:
+            created = db.execute(
+                insert(models.Attendance).values(rows).returning(
+                    models.Attendance.id,
+                    models.Attendance.student_id,
+                    models.Attendance.course_id,
+                    models.Attendance.attendance_date,
+                    models.Attendance.status
+                )
+            ).all()
+            record_attendance(db, created)
+            db.commit()
+        except IntegrityError:
+            # Another request recorded part of this roll in the meantime
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Attendance for course {roll_call.course_id} on {session_date} was recorded concurrently, please retry."
+            )
+        bump(*(f"attendance:{record.student_id}" for record in created))
+
+    return schemas.BulkAttendanceResponse(
+        course_id=roll_call.course_id,
+        attendance_date=session_date,
+        inserted=len(created),
+        attendance_records=[
+            schemas.SimpleAttendanceResponse(
+                id=record.id,
+                student_id=record.student_id,
+                course_id=record.course_id,
+                attendance_date=record.attendance_date,
+                status=record.status
+            )
+            for record in created
+        ],
+        errors=errors
+    )
 
+
+
+@router.put('/', status_code=status.HTTP_200_OK, response_model=schemas.AttendanceResponse)
+def update_attendance(user: schemas.AttendanceRequest, db: Session = Depends(get_db), teacher_id = Depends(is_teacher)):
     # Verify if the teacher is assigned to the student and course
     teacher_verify_course(teacher_id, user.student_id, user.course_id, db)
 
 
-    # Check if the attendance record exists for this student and course
+    session_date = validate_session_date(user.attendance_date)
+
+    # Check if the attendance record exists for this student, course and session, locked so a
+    # concurrent update can't apply its rollup change against the same old status
     attendance_record = db.query(models.Attendance).filter(
-        models.Attendance.student_id == user.student_id,
-        models.Attendance.course_id == user.course_id
-    ).first()
+        models.Attendance.course_id == user.course_id,
+        models.Attendance.attendance_date == session_date,
+        models.Attendance.student_id == user.student_id
+    ).with_for_update().first()
 
     if not attendance_record:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Attendance record for student {user.student_id} in course {user.course_id} does not exist."
+            detail=f"Attendance record for student {user.student_id} in course {user.course_id} on {session_date} does not exist."
         )
 
     # Validate and update the attendance status
-    if user.status and user.status.lower() in ['absent', 'present', 'excused', 'late']:
-        attendance_record.status = user.status.lower()  # Normalize status to lowercase
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid status. Status can only be 'absent', 'present', 'excused', or 'late'."
-        )
+    old_status = attendance_record.status
+    attendance_record.status = validate_status(user.status)
+    change_attendance_status(db, attendance_record, old_status)
 
     #  Commit the changes
     db.commit()
     db.refresh(attendance_record)
+    bump(f"attendance:{attendance_record.student_id}")
 
     #  Fetch student details for the response
     student = db.query(models.Student).filter(models.Student.id == attendance_record.student_id).first()
@@ -118,7 +238,7 @@ def update_attendance(user: schemas.AttendanceRequest, db: Session = Depends(get
         last_name=user_info.last_name,
         email=user_info.email,
         course_id=attendance_record.course_id,
-        attendance_date=attendance_record.attendance_date.date() if attendance_record.attendance_date else date.today(),
+        attendance_date=attendance_record.attendance_date,
         status=attendance_record.status
     )
 
@@ -127,21 +247,38 @@ def update_attendance(user: schemas.AttendanceRequest, db: Session = Depends(get
 
 
 @router.get('/{course_id}', status_code=status.HTTP_200_OK, response_model=schemas.ListAttendanceResponse)
-def get_attendance_by_course(course_id: int, db: Session = Depends(get_db), teacher_id: int = Depends(is_teacher)):
-    # Verify if the teacher is assigned to the course
-    teacher = db.query(models.Teacher).filter(models.Teacher.user_id == teacher_id).first()
-
-    if not teacher:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"No teacher found with user_id {teacher_id}."
-        )
-
-    # Fetch all attendance records for the specific course, excluding those with status "Present"
-    attendance_records = db.query(models.Attendance).filter(
+def get_attendance_by_course(course_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                             db: Session = Depends(get_db), teacher_id: int = Depends(is_teacher)):
+    # Ensure the user is a registered teacher
+    get_teacher_id(teacher_id, db)
+
+    # Fetch all attendance records for the specific course, excluding those with status "Present",
+    # with the name and email of each student in the same query
+    query = db.query(
+        models.Attendance.id,
+        models.Attendance.student_id,
+        models.Attendance.course_id,
+        models.Attendance.attendance_date,
+        models.Attendance.status,
+        models.User.first_name,
+        models.User.last_name,
+        models.User.email
+    ).join(
+        models.Student, models.Student.id == models.Attendance.student_id
+    ).join(
+        models.User, models.User.id == models.Student.user_id
+    ).filter(
         models.Attendance.course_id == course_id,
         models.Attendance.status != "present"  # Exclude "present" records
-    ).all()
+    )
+
+    # Bounding the session dates lets PostgreSQL skip the monthly partitions outside the range
+    if start_date:
+        query = query.filter(models.Attendance.attendance_date >= start_date)
+    if end_date:
+        query = query.filter(models.Attendance.attendance_date <= end_date)
+
+    attendance_records = query.order_by(models.Attendance.attendance_date, models.Attendance.id).all()
 
     if not attendance_records:
         raise HTTPException(
@@ -149,44 +286,29 @@ def get_attendance_by_course(course_id: int, db: Session = Depends(get_db), teac
             detail=f"No attendance records found for course {course_id}."
         )
 
-
-    # Count number of attendance_records for response
-    total = len(attendance_records)
-    
     # Display the course name for response format
-    course = db.query(models.Course).filter(models.Course.id == course_id).first()
+    course = db.query(models.Course.course_name).filter(models.Course.id == course_id).first()
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No course found with course_id {course_id}."
         )
-    
-
 
-    # Fetch student and course details for the response
-    response = []
-    for record in attendance_records:
-        student = db.query(models.Student).filter(models.Student.id == record.student_id).first()
-        if not student:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"No student found with student_id {record.student_id}."
-            )
-        user_info = db.query(models.User).filter(models.User.id == student.user_id).first()
-        response.append(schemas.AttendanceResponse(
-            id=record.id,
-            student_id=student.id,
-            first_name=user_info.first_name,
-            last_name=user_info.last_name,
-            email=user_info.email,
-            course_id=record.course_id,
-            attendance_date=record.attendance_date.date() if record.attendance_date else date.today(),
-            status=record.status
-        ))
-
-    # Return the response with total and message
-    return schemas.ListAttendanceResponse(
-        total=total,
-        message=f"Course name: {course.course_name}",
-        attendance_records=response
-    )
\ No newline at end of file
+    # Plain rows in the shape of schemas.ListAttendanceResponse, encoded as they are
+    return FastJSONResponse({
+        "total": len(attendance_records),
+        "message": f"Course name: {course.course_name}",
+        "attendance_records": [
+            {
+                "id": record.id,
+                "student_id": record.student_id,
+                "first_name": record.first_name,
+                "last_name": record.last_name,
+                "email": record.email,
+                "course_id": record.course_id,
+                "attendance_date": record.attendance_date,
+                "status": record.status
+            }
+            for record in attendance_records
+        ]
+    })
\ No newline at end of file
@@ -1,9 +1,14 @@
 from typing import List, Optional
 from fastapi import FastAPI, Response, HTTPException, status, APIRouter, Depends, Query
-from sqlalchemy import func
-from ..database import get_db
+from sqlalchemy import func, select
+from ..database import get_db, get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from .. import models, schemas
+from ..assignments import assignments
+from ..gradebook import invalidate_gradebook
+from ..pagination import PageParams, paginate
+from ..response_cache import CachedResponse, bump, cached_response
 from .dependencies import is_admin
 from datetime import date
 
@@ -33,6 +38,7 @@ def create_course(course: schemas.CourseCreate, db: Session = Depends(get_db), a
     db.add(new_course)
     db.commit()
     db.refresh(new_course)
+    bump("courses")
 
     # Fetch the teacher's personal information
     teacher_personal_data = db.query(models.User).filter(models.User.id == teacher.user_id).first()
@@ -52,21 +58,27 @@ def create_course(course: schemas.CourseCreate, db: Session = Depends(get_db), a
 
 
 @router.get('/{course_id}', status_code=status.HTTP_200_OK, response_model=schemas.CourseResponse)
-def get_course_by_id(course_id: int, db: Session = Depends(get_db), admin_id = Depends(is_admin)):
+async def get_course_by_id(course_id: int, db: AsyncSession = Depends(get_async_db), admin_id = Depends(is_admin),
+                           cached: CachedResponse = Depends(cached_response("courses"))):
+    if cached.hit:
+        return cached.response
+
+    # Fetch the course together with its teacher's personal data
+    row = (await db.execute(select(models.Course, models.User).outerjoin(
+        models.Teacher, models.Teacher.id == models.Course.teacher_id
+    ).outerjoin(
+        models.User, models.User.id == models.Teacher.user_id
+    ).where(
+        models.Course.id == course_id
+    ))).first()
 
     # Ensure the course is existing
-    course = db.query(models.Course).filter(models.Course.id == course_id).first()
-
-    if not course:
+    if not row:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                              detail=f"Course with code={course_id} doesn't exists.")
     
-    teacher_personal_data = db.query(models.User).join(
-        models.Teacher, models.Teacher.user_id == models.User.id
-    ).filter(
-        models.Teacher.id == course.teacher_id
-    ).first()
-    
+    course, teacher_personal_data = row
+
     if not teacher_personal_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -74,7 +86,7 @@ def get_course_by_id(course_id: int, db: Session = Depends(get_db), admin_id = D
         )
 
 
-    return schemas.CourseResponse(
+    return cached.store(schemas.CourseResponse(
         id = course.id,
         course_name = course.course_name,
         course_code = course.course_code,
@@ -85,7 +97,7 @@ def get_course_by_id(course_id: int, db: Session = Depends(get_db), admin_id = D
             last_name = teacher_personal_data.last_name,
             email = teacher_personal_data.email
         )
-    )
+    ))
 
 
 @router.put('/{course_id}', status_code=status.HTTP_200_OK, response_model=schemas.CourseResponse)
@@ -115,6 +127,7 @@ def update_course(course_id: int, course_update: schemas.CourseUpdate, db: Sessi
     course_data = course_update.dict(exclude_unset=True)
     db.query(models.Course).filter(models.Course.id == course_id).update(course_data)
     db.commit()
+    bump("courses")
 
 
     # Refresh to get the updated course
@@ -149,39 +162,50 @@ def delete_course(course_id: int, db: Session = Depends(get_db), admin_id = Depe
     # Delete the course
     db.delete(existing_course)
     db.commit()
+    assignments.discard_course(course_id)
+    invalidate_gradebook(course_id)
+    bump("courses")
     
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 
 @router.get('/', status_code=status.HTTP_200_OK, response_model=schemas.ListAllCourses)
-def get_all_courses(db: Session = Depends(get_db), admin_id = Depends(is_admin)):
+def get_all_courses(teacher_id: Optional[int] = None, page: PageParams = Depends(), db: Session = Depends(get_db), admin_id = Depends(is_admin),
+                    cached: CachedResponse = Depends(cached_response("courses"))):
+    if cached.hit:
+        return cached.response
 
-    # Query for all courses, join with teacher and user to get teacher's user details
-    courses = db.query(models.Course, models.User).join(
+    # Query for courses, join with teacher and user to get teacher's user details
+    query = db.query(models.Course, models.User).join(
         models.Teacher, models.Course.teacher_id == models.Teacher.id).join(
-            models.User, models.Teacher.user_id == models.User.id).all()
-    
-    if not courses:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"There are no courses in our database.")
-    
-    # Count total courses
-    total = len(courses)
-
-    courses_response = []
-
-    for course, teacher_user in courses:
-        courses_response.append(schemas.CourseResponse(
-            id=course.id,
-            course_name=course.course_name,
-            course_code=course.course_code,
-            description=course.description,
-            teacher=schemas.TeacherInfo(
-                id=teacher_user.id,
-                first_name=teacher_user.first_name,
-                last_name=teacher_user.last_name,
-                email=teacher_user.email
-            )
-        ))
+            models.User, models.Teacher.user_id == models.User.id)
+
+    # Optional filters
+    if teacher_id is not None:
+        query = query.filter(models.Course.teacher_id == teacher_id)
+
+    courses, next_cursor = paginate(query, models.Course, {
+        "id": models.Course.id,
+        "course_code": models.Course.course_code,
+        "course_name": models.Course.course_name
+    }, page)
     
-    return schemas.ListAllCourses(total=total, courses=courses_response)
\ No newline at end of file
+    # Plain rows in the shape of schemas.CourseResponse, encoded as they are
+    courses_response = [
+        {
+            "id": course.id,
+            "course_name": course.course_name,
+            "course_code": course.course_code,
+            "description": course.description,
+            "teacher": {
+                "id": teacher_user.id,
+                "first_name": teacher_user.first_name,
+                "last_name": teacher_user.last_name,
+                "email": teacher_user.email
+            }
+        }
+        for course, teacher_user in courses
+    ]
+
+    return cached.store({"count": len(courses), "next_cursor": next_cursor, "courses": courses_response})
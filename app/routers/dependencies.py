@@ -1,80 +1,133 @@
+import logging
+import random
 from fastapi import FastAPI, Response, HTTPException, status, APIRouter, Depends
-from ..database import get_db
+from ..database import get_db, get_async_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .. import models, oauth2
+from .. import models, oauth2, schemas
+from ..assignments import assignments
+from ..cache import TTLCache
+from ..config import settings
 from ..oauth2 import get_current_user
 
 
+logger = logging.getLogger(__name__)
 
 
+# user_id -> teacher_id / student_id, resolved on every teacher and student request
+teacher_ids = TTLCache("teacher_ids", maxsize=settings.IDENTITY_CACHE_MAX_SIZE, ttl=settings.IDENTITY_CACHE_TTL_SECONDS)
+student_ids = TTLCache("student_ids", maxsize=settings.IDENTITY_CACHE_MAX_SIZE, ttl=settings.IDENTITY_CACHE_TTL_SECONDS)
+
+
+# Resolve the teacher_id of a user, only unknown users hit the database
+def get_teacher_id(user_id: int, db: Session) -> int:
+    teacher_id = teacher_ids.get(user_id)
+    if teacher_id is None:
+        teacher = db.query(models.Teacher.id).filter(models.Teacher.user_id == user_id).first()
+        if not teacher:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No teacher found with user_id {user_id}."
+            )
+        teacher_id = teacher.id
+        teacher_ids.set(user_id, teacher_id)
+    return teacher_id
+
+
+# Resolve the student_id of a user, only unknown users hit the database
+def get_student_id(user_id: int, db: Session) -> int:
+    student_id = student_ids.get(user_id)
+    if student_id is None:
+        student = db.query(models.Student.id).filter(models.Student.user_id == user_id).first()
+        if not student:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No student found with user_id {user_id}."
+            )
+        student_id = student.id
+        student_ids.set(user_id, student_id)
+    return student_id
+
+
+# Same as get_student_id, for async handlers
+async def get_student_id_async(user_id: int, db: AsyncSession) -> int:
+    student_id = student_ids.get(user_id)
+    if student_id is None:
+        student = (await db.execute(select(models.Student.id).where(models.Student.user_id == user_id))).first()
+        if not student:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No student found with user_id {user_id}."
+            )
+        student_id = student.id
+        student_ids.set(user_id, student_id)
+    return student_id
+
+
+# Invalidation hooks, called whenever a teacher/student row or its user changes
+def invalidate_teacher(user_id: int):
+    teacher_ids.invalidate(user_id)
+
+
+def invalidate_student(user_id: int):
+    student_ids.invalidate(user_id)
+
 
 def teacher_verify_course(user_id: int, student_id: int, course_id: int, db: Session = Depends(get_db)):
     #  Get the teacher_id based on user_id
-    teacher = db.query(models.Teacher).filter(models.Teacher.user_id == user_id).first()
-
-    if not teacher:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"No teacher found with user_id {user_id}."
-        )
+    teacher_id = get_teacher_id(user_id, db)
 
     #  Verify if the teacher is assigned to the student and course
-    course_assignment = db.query(models.StudentCourse).filter(
-        models.StudentCourse.teacher_id == teacher.id,
-        models.StudentCourse.student_id == student_id,
-        models.StudentCourse.course_id == course_id
-    ).first()
-
-    if not course_assignment:
+    if not assignments.is_assigned(teacher_id, student_id, course_id, db):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Teacher with user_id {user_id} (teacher_id {teacher.id}) is not assigned to student {student_id} for course {course_id}."
+            detail=f"Teacher with user_id {user_id} (teacher_id {teacher_id}) is not assigned to student {student_id} for course {course_id}."
         )
 
     return True
 
-# Ensure that who makes Create, update, delete is teacher!
-def is_teacher(current_user: models.User = Depends(oauth2.get_current_user), db: Session = Depends(get_db)) -> int:
+# Role ids as inserted into the roles table
+ADMIN_ROLE_ID = 1
+TEACHER_ROLE_ID = 2
+STUDENT_ROLE_ID = 3
 
-    print(f"Checking teacher permissions for user with ID {current_user.id} and role ID {current_user.role_id}")
 
-    # Ensure the current user exists and has teacher privileges (teacher role_id = 2)
-    if current_user.role_id != 2:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, 
-            detail=f"User id={current_user.id} does not have teacher permissions"
-        )
-    
-    # Return the teacher's user_id
-    return current_user.id
+# Build a dependency that authorizes from the decoded token alone, without a database session.
+# Denials are always logged; granted checks are only logged for a sample of requests.
+# The guard never blocks, so it runs on the event loop instead of a threadpool worker.
+def require_role(role_id: int, role_name: str):
 
+    async def role_guard(current_user: schemas.TokenData = Depends(oauth2.get_current_user)) -> int:
+        if current_user.role_id != role_id:
+            logger.warning("role_check outcome=denied user_id=%s role_id=%s required_role=%s",
+                           current_user.id, current_user.role_id, role_name)
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, 
+                detail=f"User id={current_user.id} does not have {role_name} permissions"
+            )
 
-# Function that ensures modifications are done by an admin
-def is_admin(current_user: models.User = Depends(oauth2.get_current_user), db: Session = Depends(get_db)) -> int:
-    print(f"Checking admin permissions for user with ID {current_user.id} and role ID {current_user.role_id}")
+        if random.random() < settings.AUTH_LOG_SAMPLE_RATE:
+            logger.info("role_check outcome=granted user_id=%s role_id=%s required_role=%s",
+                        current_user.id, current_user.role_id, role_name)
 
-    # Ensure the current user exists and has admin privileges (Admin role_id = 1)
-    if current_user.role_id != 1:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, 
-            detail=f"User id={current_user.id} does not have admin permissions"
-        )
-    
-    # Return the admin's user_id
-    return current_user.id
+        # Return the user_id of the authorized user
+        return current_user.id
 
+    role_guard.__name__ = f"is_{role_name}"
+    return role_guard
 
 
-def is_student(current_user: models.User = Depends(oauth2.get_current_user), db: Session = Depends(get_db)) -> int:
-    
-    print(f"Checking student permissions for user with ID {current_user.id} and role ID {current_user.role_id}")
+# Ensure that who makes Create, update, delete is teacher!
+is_teacher = require_role(TEACHER_ROLE_ID, "teacher")
 
-    # Ensure the current user exists and has student privileges (Student role_id = 3)
-    if current_user.role_id != 3:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, 
-            detail=f"User id={current_user.id} does not have student permissions"
-        )
-    
-    # Return the student's user_id
-    return current_user.id
\ No newline at end of file
+# Ensure that modifications are done by an admin
+is_admin = require_role(ADMIN_ROLE_ID, "admin")
+
+# Ensure that the student routes are used by students
+is_student = require_role(STUDENT_ROLE_ID, "student")
+
+
+# Student id of the calling student, for routes that depend on it before their handler runs
+async def current_student_id(user_id: int = Depends(is_student), db: AsyncSession = Depends(get_async_db)) -> int:
+    return await get_student_id_async(user_id, db)
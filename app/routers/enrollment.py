@@ -1,8 +1,14 @@
 from typing import List, Optional
 from fastapi import FastAPI, Response, HTTPException, status, APIRouter, Depends, Query
-from ..database import get_db
-from sqlalchemy.orm import Session
+from ..database import get_db, get_async_db
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from .. import models, schemas
+from ..assignments import assignments
+from ..gradebook import invalidate_gradebook
 from .dependencies import is_admin, teacher_verify_course
 from datetime import date
 
@@ -61,8 +67,15 @@ def enroll_student(enroll: schemas.EnrollmentRequest, db: Session = Depends(get_
     
     # Add new enrollment to the database
     db.add(new_enrollment)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Enrolled by a concurrent request since the check above
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Student is already enrolled in this course with this teacher.")
     db.refresh(new_enrollment)
+    assignments.add(new_enrollment.teacher_id, new_enrollment.student_id, new_enrollment.course_id)
+    invalidate_gradebook(new_enrollment.course_id)
 
     return schemas.EnrollmentResponse(
         message="Student enrolled successfully.",
@@ -82,31 +95,88 @@ def enroll_student(enroll: schemas.EnrollmentRequest, db: Session = Depends(get_
         )
     )
 
+# Enroll a cohort of students into a course with one teacher
+@router.post('/bulk', status_code=status.HTTP_201_CREATED, response_model=schemas.BulkEnrollmentResponse)
+def bulk_enroll_students(enroll: schemas.BulkEnrollmentRequest, db: Session = Depends(get_db), admin_id = Depends(is_admin)):
+
+    # Ensure course and teacher already exist
+    if not db.query(models.Course.id).filter(models.Course.id == enroll.course_id).first():
+        raise HTTPException(status_code=404, detail=f"Course with id={enroll.course_id} not found")
+    if not db.query(models.Teacher.id).filter(models.Teacher.id == enroll.teacher_id).first():
+        raise HTTPException(status_code=404, detail=f"Teacher with id={enroll.teacher_id} not found")
+
+    if enroll.enrollment_date > date.today() or enroll.enrollment_date < date(2000,1,1):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"The enrollment date should not in the future or older than 2000-1-1")
+
+    # Ensure all students exist with a single IN query
+    student_ids = list(dict.fromkeys(enroll.student_ids))
+    existing = {student_id for student_id, in db.query(models.Student.id).filter(models.Student.id.in_(student_ids))} if student_ids else set()
+    errors = [
+        schemas.BulkEnrollmentError(student_id=student_id, detail=f"student with id={student_id} not found")
+        for student_id in student_ids if student_id not in existing
+    ]
+
+    # Insert every enrollment in one statement, students already enrolled with this teacher are skipped
+    enrolled = []
+    rows = [
+        {"student_id": student_id, "course_id": enroll.course_id, "teacher_id": enroll.teacher_id, "enrollment_date": enroll.enrollment_date}
+        for student_id in student_ids if student_id in existing
+    ]
+    if rows:
+        enrolled = db.execute(
+            insert(models.StudentCourse).values(rows).on_conflict_do_nothing(
+                index_elements=['course_id', 'teacher_id', 'student_id']
+            ).returning(models.StudentCourse.student_id)
+        ).scalars().all()
+        db.commit()
+
+    for student_id in enrolled:
+        assignments.add(enroll.teacher_id, student_id, enroll.course_id)
+    if enrolled:
+        invalidate_gradebook(enroll.course_id)
+
+    return schemas.BulkEnrollmentResponse(
+        course_id=enroll.course_id,
+        teacher_id=enroll.teacher_id,
+        enrollment_date=enroll.enrollment_date,
+        inserted=len(enrolled),
+        skipped=len(enroll.student_ids) - len(enrolled) - len(errors),
+        enrolled_student_ids=enrolled,
+        errors=errors
+    )
+
+
+# Load a course roster with the student/teacher user data eagerly joined
+async def load_course_roster(course_id: int, db: AsyncSession):
+    return (await db.scalars(select(models.StudentCourse).options(
+        joinedload(models.StudentCourse.student).joinedload(models.Student.user),
+        joinedload(models.StudentCourse.teacher).joinedload(models.Teacher.user)
+    ).where(
+        models.StudentCourse.course_id == course_id
+    ).order_by(models.StudentCourse.id))).all()
+
+
 # Get enrollments for a specific course
 @router.get('/{course_id}', status_code=status.HTTP_200_OK, response_model=schemas.EnrollmentResponseList)
-def get_enrollments_by_course(course_id: int, db: Session = Depends(get_db), admin_id = Depends(is_admin)):
+async def get_enrollments_by_course(course_id: int, db: AsyncSession = Depends(get_async_db), admin_id = Depends(is_admin)):
     #  Ensure the course exists and fetch the course name
-    course = db.query(models.Course).filter(models.Course.id == course_id).first()
+    course = await db.get(models.Course, course_id)
     if not course:
         raise HTTPException(status_code=404, detail=f"Course with id={course_id} not found")
     
     course_name = course.course_name
 
-    #  Fetch all enrollments for the course
-    enrollments = db.query(models.StudentCourse).filter(models.StudentCourse.course_id == course_id).all()
+    #  Fetch all enrollments for the course in a single statement, students and teachers included
+    enrollments = await load_course_roster(course_id, db)
     if not enrollments:
         raise HTTPException(status_code=404, detail=f"No enrollments found for course id={course_id}")
     
     #  Prepare the response with enrollment details
     enrollment_responses = []
     for enrollment in enrollments:
-        # Fetch student details
-        student = db.query(models.Student).filter(models.Student.id == enrollment.student_id).first()
-        student_user = db.query(models.User).filter(models.User.id == student.user_id).first()
-
-        # Fetch teacher details
-        teacher = db.query(models.Teacher).filter(models.Teacher.id == enrollment.teacher_id).first()
-        teacher_user = db.query(models.User).filter(models.User.id == teacher.user_id).first()
+        student_user = enrollment.student.user
+        teacher_user = enrollment.teacher.user
 
         # Build the response for each enrollment, including the course name
         enrollment_responses.append(schemas.EnrollmentResponse(
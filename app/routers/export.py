@@ -0,0 +1,123 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from .. import models
+from ..exports import EXPORT_FORMATS, MEDIA_TYPES, export_headers, stream_rows
+from .dependencies import is_admin
+
+
+router = APIRouter(
+    prefix='/admin/export',
+    tags=['Export']
+)
+
+FORMAT_PATTERN = f"^({'|'.join(EXPORT_FORMATS)})$"
+
+
+def export_response(statement, name: str, format: str, gzip: bool) -> StreamingResponse:
+    return StreamingResponse(
+        stream_rows(statement, format, gzip),
+        media_type=MEDIA_TYPES[format],
+        headers=export_headers(name, format, gzip)
+    )
+
+
+# Every grade with the student and course it belongs to
+@router.get('/grades')
+def export_grades(course_id: Optional[int] = None, student_id: Optional[int] = None,
+                  format: str = Query("csv", pattern=FORMAT_PATTERN), gzip: bool = False,
+                  admin_id = Depends(is_admin)):
+
+    statement = select(
+        models.Grade.id,
+        models.Grade.student_id,
+        models.User.first_name,
+        models.User.last_name,
+        models.User.email,
+        models.Grade.course_id,
+        models.Course.course_name,
+        models.Grade.grade,
+        models.Grade.comments,
+        models.Grade.graded_at
+    ).join(models.Student, models.Student.id == models.Grade.student_id) \
+     .join(models.User, models.User.id == models.Student.user_id) \
+     .join(models.Course, models.Course.id == models.Grade.course_id)
+
+    if course_id is not None:
+        statement = statement.where(models.Grade.course_id == course_id)
+    if student_id is not None:
+        statement = statement.where(models.Grade.student_id == student_id)
+
+    return export_response(statement.order_by(models.Grade.id), "grades", format, gzip)
+
+
+# Attendance records, bounded by session date so only the matching monthly partitions are read
+@router.get('/attendance')
+def export_attendance(course_id: Optional[int] = None, student_id: Optional[int] = None,
+                      start_date: Optional[date] = None, end_date: Optional[date] = None,
+                      format: str = Query("csv", pattern=FORMAT_PATTERN), gzip: bool = False,
+                      admin_id = Depends(is_admin)):
+
+    statement = select(
+        models.Attendance.id,
+        models.Attendance.student_id,
+        models.User.first_name,
+        models.User.last_name,
+        models.User.email,
+        models.Attendance.course_id,
+        models.Course.course_name,
+        models.Attendance.attendance_date,
+        models.Attendance.status
+    ).join(models.Student, models.Student.id == models.Attendance.student_id) \
+     .join(models.User, models.User.id == models.Student.user_id) \
+     .join(models.Course, models.Course.id == models.Attendance.course_id)
+
+    if course_id is not None:
+        statement = statement.where(models.Attendance.course_id == course_id)
+    if student_id is not None:
+        statement = statement.where(models.Attendance.student_id == student_id)
+    if start_date:
+        statement = statement.where(models.Attendance.attendance_date >= start_date)
+    if end_date:
+        statement = statement.where(models.Attendance.attendance_date <= end_date)
+
+    return export_response(
+        statement.order_by(models.Attendance.attendance_date, models.Attendance.id), "attendance", format, gzip
+    )
+
+
+# Enrollments with the student's and the teacher's names
+@router.get('/enrollments')
+def export_enrollments(course_id: Optional[int] = None, teacher_id: Optional[int] = None,
+                       format: str = Query("csv", pattern=FORMAT_PATTERN), gzip: bool = False,
+                       admin_id = Depends(is_admin)):
+
+    student_user = aliased(models.User)
+    teacher_user = aliased(models.User)
+    statement = select(
+        models.StudentCourse.id,
+        models.StudentCourse.student_id,
+        student_user.first_name.label("student_first_name"),
+        student_user.last_name.label("student_last_name"),
+        student_user.email.label("student_email"),
+        models.StudentCourse.course_id,
+        models.Course.course_name,
+        models.StudentCourse.teacher_id,
+        teacher_user.first_name.label("teacher_first_name"),
+        teacher_user.last_name.label("teacher_last_name"),
+        models.StudentCourse.enrollment_date
+    ).join(models.Student, models.Student.id == models.StudentCourse.student_id) \
+     .join(student_user, student_user.id == models.Student.user_id) \
+     .join(models.Teacher, models.Teacher.id == models.StudentCourse.teacher_id) \
+     .join(teacher_user, teacher_user.id == models.Teacher.user_id) \
+     .join(models.Course, models.Course.id == models.StudentCourse.course_id)
+
+    if course_id is not None:
+        statement = statement.where(models.StudentCourse.course_id == course_id)
+    if teacher_id is not None:
+        statement = statement.where(models.StudentCourse.teacher_id == teacher_id)
+
+    return export_response(statement.order_by(models.StudentCourse.id), "enrollments", format, gzip)
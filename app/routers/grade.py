@@ -3,7 +3,11 @@ from fastapi import FastAPI, Response, HTTPException, status, APIRouter, Depends
 from ..database import get_db
 from sqlalchemy.orm import Session
 from .. import models, schemas
-from .dependencies import is_teacher, teacher_verify_course
+from ..assignments import assignments
+from ..gradebook import invalidate_gradebook, load_gradebook
+from ..transcripts import change_grade, record_grade, remove_grade
+from ..response_cache import bump
+from .dependencies import is_teacher, teacher_verify_course, get_teacher_id
 from datetime import date
 
 router = APIRouter(
@@ -50,8 +54,13 @@ def create_grade(grade: schemas.CreateGrade, db: Session = Depends(get_db), teac
     # Create a new grade
     new_grade = models.Grade(**grade.dict())
     db.add(new_grade)
+    db.flush()
+    db.refresh(new_grade)  # graded_at is set by the database and decides the term
+    record_grade(db, new_grade)
     db.commit()
     db.refresh(new_grade)
+    invalidate_gradebook(new_grade.course_id)
+    bump(f"grades:{new_grade.student_id}")
 
     # Return response with `graded_at` as a date
     return schemas.ResponseGrade(
@@ -68,8 +77,9 @@ def create_grade(grade: schemas.CreateGrade, db: Session = Depends(get_db), teac
 @router.put('/{grade_id}', status_code=status.HTTP_200_OK, response_model=schemas.ResponseGrade)
 def update_grade(grade_id: int, grade: schemas.UpdateGrade, db: Session = Depends(get_db), teacher_id = Depends(is_teacher)):
 
-    # Fetch the existing grade based on 'grade_id'
-    existing_grade = db.query(models.Grade).filter(models.Grade.id == grade_id).first()
+    # Fetch the existing grade based on 'grade_id', locked so a concurrent update can't apply its
+    # GPA summary change against the same old grade
+    existing_grade = db.query(models.Grade).filter(models.Grade.id == grade_id).with_for_update().first()
 
     if not existing_grade:
         raise HTTPException(
@@ -82,13 +92,17 @@ def update_grade(grade_id: int, grade: schemas.UpdateGrade, db: Session = Depend
 
     # Update only the fields that are provided in the request
     if grade.grade is not None:
+        old_grade = existing_grade.grade
         existing_grade.grade = grade.grade
+        change_grade(db, existing_grade, old_grade)
     if grade.comments is not None:
         existing_grade.comments = grade.comments
 
     # Commit changes to the database
     db.commit()
     db.refresh(existing_grade)
+    invalidate_gradebook(existing_grade.course_id)
+    bump(f"grades:{existing_grade.student_id}")
 
     # Return the updated grade and convert 'graded_at' to a date
     return schemas.ResponseGrade(
@@ -103,8 +117,8 @@ def update_grade(grade_id: int, grade: schemas.UpdateGrade, db: Session = Depend
 @router.delete('/{grade_id}', status_code=status.HTTP_204_NO_CONTENT)
 def delete_grade(grade_id: int, db: Session = Depends(get_db), teacher_id = Depends(is_teacher)):
 
-    # Fetch the existing grade by 'grade_id'
-    existing_grade = db.query(models.Grade).filter(models.Grade.id == grade_id).first()
+    # Fetch the existing grade by 'grade_id', locked so concurrent deletes remove it from the GPA summary once
+    existing_grade = db.query(models.Grade).filter(models.Grade.id == grade_id).with_for_update().first()
 
     if not existing_grade:
         raise HTTPException(
@@ -116,7 +130,34 @@ def delete_grade(grade_id: int, db: Session = Depends(get_db), teacher_id = Depe
     teacher_verify_course(teacher_id, existing_grade.student_id, existing_grade.course_id, db)
 
     # Delete the grade
+    course_id, student_id = existing_grade.course_id, existing_grade.student_id
+    remove_grade(db, existing_grade)
     db.delete(existing_grade)
     db.commit()
+    invalidate_gradebook(course_id)
+    bump(f"grades:{student_id}")
 
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+
+# Gradebook of a course: every enrolled student's grade and the course's grade distribution
+@router.get('/gradebook/{course_id}', status_code=status.HTTP_200_OK, response_model=schemas.CourseGradebook)
+def get_course_gradebook(course_id: int, db: Session = Depends(get_db), teacher_id = Depends(is_teacher)):
+
+    course = db.query(models.Course).filter(models.Course.id == course_id).first()
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Course with id {course_id} does not exist"
+        )
+
+    # Only teachers assigned to students of the course can read its gradebook
+    teacher = get_teacher_id(teacher_id, db)
+    if course.teacher_id != teacher and not assignments.assigned_students(teacher, course_id, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Teacher with user_id {teacher_id} (teacher_id {teacher}) is not assigned to course {course_id}."
+        )
+
+    return load_gradebook(course, db)
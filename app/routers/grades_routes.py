@@ -1,10 +1,13 @@
 from typing import List
 from fastapi import FastAPI, Response, HTTPException, status, APIRouter, Depends
-from ..database import get_db
-from sqlalchemy.orm import Session
+from ..database import get_async_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import models, schemas
+from ..transcripts import build_transcript, transcript_statement
 from datetime import date
-from .dependencies import is_student
+from ..response_cache import CachedResponse, cached_response
+from .dependencies import is_student, get_student_id_async, current_student_id
 
 
 
@@ -15,10 +18,16 @@ router = APIRouter(
 
 
 @router.get('/', response_model=List[schemas.ResponseGrade])
-def get_own_grades(db: Session = Depends(get_db), student_id: int = Depends(is_student)):
+async def get_own_grades(db: AsyncSession = Depends(get_async_db), user_id: int = Depends(is_student),
+                         cached: CachedResponse = Depends(cached_response("courses", scoped=("grades",), scope=current_student_id))):
+    if cached.hit:
+        return cached.response
+
+    # The role guard returns the user's id, resolve the matching student record
+    student_id = await get_student_id_async(user_id, db)
 
     # Fetch grades and course information for the specific student
-    grades = db.query(
+    grades = (await db.execute(select(
         models.Grade.id,
         models.Grade.student_id,
         models.Grade.course_id,
@@ -28,24 +37,32 @@ def get_own_grades(db: Session = Depends(get_db), student_id: int = Depends(is_s
         models.Course.course_name  # Fetch course_name from the Course table
     ).join(
         models.Course, models.Course.id == models.Grade.course_id  # Join with the Course table
-    ).filter(
+    ).where(
         models.Grade.student_id == student_id  # Use current_user_id from dependency
-    ).all()
+    ))).all()
 
     # Check if any grades are returned
     if not grades:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No grades found for the student with id={student_id}")
 
-    # Map to ResponseGrade schema
-    return [
-        schemas.ResponseGrade(
-            id=grade.id,
-            student_id=grade.student_id,
-            course_id=grade.course_id,
-            course_name=grade.course_name,
-            grade=grade.grade,
-            comments=grade.comments,
-            graded_at=grade.graded_at.date()
-        )
+    # Plain rows in the shape of schemas.ResponseGrade, encoded as they are
+    return cached.store([
+        {
+            "student_id": grade.student_id,
+            "course_id": grade.course_id,
+            "grade": grade.grade,
+            "comments": grade.comments,
+            "id": grade.id,
+            "graded_at": grade.graded_at.date()
+        }
         for grade in grades
-    ]
+    ])
+
+
+# GPA per term and cumulative, from the student's summary rows rather than the grade history
+@router.get('/transcript', response_model=schemas.Transcript)
+async def get_own_transcript(db: AsyncSession = Depends(get_async_db), user_id: int = Depends(is_student)):
+
+    student_id = await get_student_id_async(user_id, db)
+    terms = (await db.scalars(transcript_statement(student_id))).all()
+    return build_transcript(student_id, terms)
@@ -0,0 +1,24 @@
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from ..config import settings
+from ..instrumentation import render_metrics
+
+
+router = APIRouter(
+    tags=['Monitoring']
+)
+
+
+# Prometheus scrape endpoint with the metrics of the worker serving the scrape. Scrapers don't log in,
+# so instead of a role it is protected by METRICS_TOKEN when one is configured.
+@router.get('/metrics', status_code=status.HTTP_200_OK, response_class=PlainTextResponse)
+def get_metrics(authorization: Optional[str] = Header(None)):
+    if settings.METRICS_TOKEN and not secrets.compare_digest(authorization or "", f"Bearer {settings.METRICS_TOKEN}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="A valid metrics token is required"
+        )
+
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, status
+from .. import cache, query_guard
+from ..database import async_engine, engine, pool_status
+from .dependencies import is_admin
+
+
+router = APIRouter(
+    prefix='/admin/monitoring',
+    tags=['Monitoring']
+)
+
+
+# Hit/miss counters of the in-process caches of this worker
+@router.get('/caches', status_code=status.HTTP_200_OK)
+def get_cache_stats(admin_id = Depends(is_admin)):
+    return {name: registered.stats() for name, registered in cache.registry.items()}
+
+
+# Connection pool usage and checkout wait times of this worker
+@router.get('/pool', status_code=status.HTTP_200_OK)
+def get_pool_stats(admin_id = Depends(is_admin)):
+    return {
+        "sync": pool_status(engine.pool, "sync"),
+        "async": pool_status(async_engine.pool, "async"),
+    }
+
+
+# Statements repeated within a request (N+1 queries) and lazy loads per route, with their call sites,
+# when N_PLUS_ONE_DETECTION or LAZY_LOAD_GUARD="warn" is on for this worker
+@router.get('/queries', status_code=status.HTTP_200_OK)
+def get_query_report(admin_id = Depends(is_admin)):
+    return query_guard.report.snapshot()
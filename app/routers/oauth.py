@@ -1,9 +1,12 @@
 from fastapi import APIRouter, HTTPException, status, Response, Depends
+from datetime import datetime, timezone
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import database, schemas, models, utils, oauth2
-from ..database import get_db
+from ..database import get_async_db
 
 
 router = APIRouter(
@@ -11,10 +14,15 @@ router = APIRouter(
 )
 
 @router.post('/login', response_model=schemas.Token)
-def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
 
     # Fetch the user based on provided username (which is 'email')
-    user = db.query(models.User).filter(models.User.email == user_credentials.username).first()
+    user = (await db.execute(select(
+        models.User.id, models.User.role_id, models.User.password_hash
+    ).where(models.User.email == user_credentials.username))).first()
+
+    # Give the connection back to the pool while bcrypt runs
+    await db.close()
 
     # Check if user exists
     if not user:
@@ -24,17 +32,82 @@ def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session =
         )
 
 
-    # Verify password using the utils.verify_password function
-    if not utils.verify_password(user_credentials.password, user.password_hash):
+    # Verify password in the hashing process pool, without blocking the event loop
+    valid, new_hash = await utils.verify_and_update_password_async(user_credentials.password, user.password_hash)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid credentials"
         )
+
+    # The hash was made with an outdated bcrypt cost, store the rehashed password
+    if new_hash:
+        await db.execute(update(models.User).where(models.User.id == user.id).values(password_hash=new_hash))
+        await db.commit()
     
 
-    # Generate a token if credntials are correct
+    # Generate the tokens if credntials are correct
+    access_token = oauth2.create_access_token(data={"user_id": user.id, "role_id": user.role_id})
+    refresh_token = oauth2.create_refresh_token(data={"user_id": user.id})
+
+    # Return the tokens in reponse
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+# Add a refresh token to the revocation list; fails with IntegrityError if it already is there
+async def revoke_refresh_token(payload: dict, db: AsyncSession):
+    # Forget revoked tokens that have expired on their own
+    await db.execute(delete(models.RevokedToken).where(models.RevokedToken.expires_at < func.now()))
+    db.add(models.RevokedToken(
+        jti=payload["jti"],
+        user_id=payload["user_id"],
+        expires_at=datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+    ))
+    await db.commit()
+
+
+# Exchange a refresh token for a new access/refresh pair, the used refresh token is revoked
+@router.post('/refresh', response_model=schemas.Token)
+async def refresh(request: schemas.RefreshTokenRequest, db: AsyncSession = Depends(get_async_db)):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+    payload = oauth2.verify_refresh_token(request.refresh_token, credentials_exception)
+
+    # Load the user's current role, the user may have been deleted or changed since the login
+    user = (await db.execute(select(models.User.id, models.User.role_id).where(models.User.id == payload["user_id"]))).first()
+    if not user:
+        raise credentials_exception
+
+    # Rotating the token revokes it; a token that was already revoked is rejected here
+    try:
+        await revoke_refresh_token(payload, db)
+    except IntegrityError:
+        raise credentials_exception
+
     access_token = oauth2.create_access_token(data={"user_id": user.id, "role_id": user.role_id})
+    refresh_token = oauth2.create_refresh_token(data={"user_id": user.id})
+
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+# Revoke a refresh token, the access token stays valid until it expires
+@router.post('/logout', status_code=status.HTTP_204_NO_CONTENT)
+async def logout(request: schemas.RefreshTokenRequest, db: AsyncSession = Depends(get_async_db)):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+    payload = oauth2.verify_refresh_token(request.refresh_token, credentials_exception)
+
+    try:
+        await revoke_refresh_token(payload, db)
+    except IntegrityError:
+        # Already revoked
+        pass
 
-    # Return the token in reponse
-    return {"access_token": access_token, "token_type": "bearer"}
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
@@ -1,10 +1,16 @@
-from typing import List
-from fastapi import FastAPI, Response, HTTPException, status, APIRouter, Depends
+from typing import List, Optional
+from fastapi import FastAPI, Response, HTTPException, status, APIRouter, Depends, File, UploadFile, Query
 from ..database import get_db
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from .. import models, schemas
+from ..assignments import assignments
+from ..gradebook import gradebooks
+from ..transcripts import build_transcript, transcript_statement
+from ..response_cache import CachedResponse, bump, cached_response
+from ..imports import IMPORT_FORMATS, import_format, provision_profiles, stream_import
+from ..pagination import PageParams, paginate
 from datetime import date
-from .dependencies import is_student, is_admin
+from .dependencies import is_student, is_admin, invalidate_student
 
 router = APIRouter(
     prefix='/students',
@@ -35,10 +41,28 @@ def create_student(student: schemas.StudentCreate, db: Session = Depends(get_db)
     db.add(new_student)
     db.commit()
     db.refresh(new_student)
+    invalidate_student(new_student.user_id)
+    bump("students")
 
     return new_student
 
 
+# Provision students, creating their user accounts where missing, from an uploaded CSV (with header)
+# or NDJSON file. The report is streamed back as NDJSON, one line per row.
+@router.post('/import', status_code=status.HTTP_200_OK)
+def bulk_provision_students(file: UploadFile = File(...), format: str = Query(None, pattern=f"^({'|'.join(IMPORT_FORMATS)})$"),
+                      admin_id = Depends(is_admin)):
+
+    fmt = import_format(file.filename, format)
+
+    def students_changed(summary: dict):
+        if summary["created"]:
+            bump("students")
+
+    return stream_import(file, lambda db, lines: provision_profiles(db, lines, fmt, "student"),
+                         on_created=lambda result: invalidate_student(result["user_id"]), on_finish=students_changed)
+
+
 # @router.get('/{id}', status_code=status.HTTP_200_OK, response_model=schemas.StudentResponse)
 # def get_student(id: int, db: Session = Depends(get_db), admin_id = Depends(is_admin)):
 
@@ -55,7 +79,10 @@ def create_student(student: schemas.StudentCreate, db: Session = Depends(get_db)
 
 
 @router.get('/{id}', status_code=status.HTTP_201_CREATED, response_model=schemas.StudentResponse)
-def get_student(id: int, db: Session = Depends(get_db), admin_id = Depends(is_admin)):
+def get_student(id: int, db: Session = Depends(get_db), admin_id = Depends(is_admin),
+                cached: CachedResponse = Depends(cached_response("students"))):
+    if cached.hit:
+        return cached.response
 
     existing_user = db.query(models.Student).filter(models.Student.id == id).first()
 
@@ -65,7 +92,20 @@ def get_student(id: int, db: Session = Depends(get_db), admin_id = Depends(is_ad
             detail=f"The Student with id={id} does not exist in our database"
         )
     
-    return existing_user
+    return cached.store(schemas.StudentResponse.model_validate(existing_user))
+
+
+# GPA per term and cumulative of a student
+@router.get('/{id}/transcript', status_code=status.HTTP_200_OK, response_model=schemas.Transcript)
+def get_student_transcript(id: int, db: Session = Depends(get_db), admin_id = Depends(is_admin)):
+
+    if not db.query(models.Student.id).filter(models.Student.id == id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"The Student with id={id} does not exist in our database"
+        )
+
+    return build_transcript(id, db.scalars(transcript_statement(id)).all())
 
 
 @router.delete('/{id}', status_code=status.HTTP_204_NO_CONTENT)
@@ -73,16 +113,22 @@ def delete_student(id: int, db: Session = Depends(get_db), admin_id = Depends(is
 
     # Query that check if user exists based on id
     delete_query = db.query(models.Student).filter(models.Student.id == id)
+    existing_student = delete_query.first()
 
     # Check if user doesn't exists
-    if not delete_query.first():   
+    if not existing_student:   
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail=f"The student with id={id} does not exist in our database"
         )
     
+    student_user_id = existing_student.user_id
     delete_query.delete(synchronize_session=False)
     db.commit()
+    invalidate_student(student_user_id)
+    assignments.discard_student(id)
+    gradebooks.clear()
+    bump("students")
 
     return Response(status_code=204)
 
@@ -130,6 +176,9 @@ def update_student(student: schemas.StudentUpdate, id: int, db: Session = Depend
                             detail=f"The student age should not greater than 25.")
     
 
+    # The student may move to another user below
+    previous_user_id = student_data.user_id
+
     # If guardian_email is provided, ensure the associated user exists
     if student.guardian_email:
         user = db.query(models.User).filter(models.User.email == student.guardian_email).first()
@@ -145,21 +194,28 @@ def update_student(student: schemas.StudentUpdate, id: int, db: Session = Depend
     db.commit()
 
     db.refresh(student_data)  # Refresh to get the updated student data, including updated_at
+    invalidate_student(previous_user_id)
+    invalidate_student(student_data.user_id)
+    bump("students")
 
     return student_data
 
-@router.get('/', status_code=status.HTTP_200_OK, response_model=List[schemas.StudentResponse])
-def get_students(db: Session = Depends(get_db), admin_id = Depends(is_admin)):
+@router.get('/', status_code=status.HTTP_200_OK, response_model=schemas.ListAllStudents)
+def get_students(current_grade_level: Optional[int] = None, page: PageParams = Depends(), db: Session = Depends(get_db), admin_id = Depends(is_admin)):
 
-    display_all_student = db.query(models.Student).all()
+    query = db.query(models.Student).options(joinedload(models.Student.user))
 
-    if not display_all_student:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, 
-            detail=f"There no student in our database"
-        )
-    
-    return display_all_student
+    # Optional filters
+    if current_grade_level is not None:
+        query = query.filter(models.Student.current_grade_level == current_grade_level)
+
+    display_all_student, next_cursor = paginate(query, models.Student, {
+        "id": models.Student.id,
+        "enrollment_date": models.Student.enrollment_date,
+        "current_grade_level": models.Student.current_grade_level
+    }, page)
+
+    return schemas.ListAllStudents(count=len(display_all_student), next_cursor=next_cursor, students=display_all_student)
 
 
 # @router.get('/grades/user_id/{user_id}', response_model=List[schemas.ResponseGrade])
@@ -1,10 +1,12 @@
 from typing import List
 from fastapi import FastAPI, Response, HTTPException, status, APIRouter, Depends
-from ..database import get_db
-from sqlalchemy.orm import Session
+from ..database import get_async_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import models, schemas
 from datetime import date
-from .dependencies import is_student
+from ..response_cache import CachedResponse, cached_response
+from .dependencies import is_student, get_student_id_async, current_student_id
 
 router = APIRouter(
     prefix='/student-attendance',
@@ -12,16 +14,23 @@ router = APIRouter(
 )
 
 @router.get('/', status_code=status.HTTP_200_OK, response_model=schemas.ListStudentAttendanceResponse)
-def get_student_attendance(db: Session = Depends(get_db), student_id: int = Depends(is_student)):
+async def get_student_attendance(db: AsyncSession = Depends(get_async_db), user_id: int = Depends(is_student),
+                                 cached: CachedResponse = Depends(cached_response("courses", scoped=("attendance",), scope=current_student_id))):
+    if cached.hit:
+        return cached.response
+
+    # The role guard returns the user's id, resolve the matching student record
+    student_id = await get_student_id_async(user_id, db)
+
     # Fetch the attendance records for the student
-    attendance_records = db.query(
+    attendance_records = (await db.execute(select(
         models.Attendance, 
         models.Course.course_name
     ).join(
         models.Course, models.Course.id == models.Attendance.course_id
-    ).filter(
+    ).where(
         models.Attendance.student_id == student_id
-    ).all()
+    ))).all()
 
     if not attendance_records:
         raise HTTPException(
@@ -34,10 +43,10 @@ def get_student_attendance(db: Session = Depends(get_db), student_id: int = Depe
         schemas.StudentAttendanceResponse(
             id=attendance.id,
             course_name=course_name,
-            attendance_date=attendance.attendance_date.date() if attendance.attendance_date else date.today(),
+            attendance_date=attendance.attendance_date,
             status=attendance.status
         )
         for attendance, course_name in attendance_records
     ]
 
-    return schemas.ListStudentAttendanceResponse(attendance_records=attendance_list)
\ No newline at end of file
+    return cached.store(schemas.ListStudentAttendanceResponse(attendance_records=attendance_list))
\ No newline at end of file
@@ -1,9 +1,13 @@
 from typing import List, Optional
-from fastapi import FastAPI, Response, HTTPException, status, APIRouter, Depends, Query
+from fastapi import FastAPI, Response, HTTPException, status, APIRouter, Depends, File, UploadFile, Query
 from ..database import get_db
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from .. import models, schemas
-from .dependencies import is_teacher, teacher_verify_course, is_admin
+from ..assignments import assignments
+from ..imports import IMPORT_FORMATS, import_format, provision_profiles, stream_import
+from ..response_cache import bump
+from ..pagination import PageParams, paginate
+from .dependencies import is_teacher, teacher_verify_course, is_admin, invalidate_teacher
 from datetime import date
 
 router = APIRouter(
@@ -42,6 +46,7 @@ def create_teacher(teacher: schemas.TeacherCreate, db: Session = Depends(get_db)
     db.add(new_teacher)
     db.commit()
     db.refresh(new_teacher)
+    invalidate_teacher(new_teacher.user_id)
 
     return new_teacher
 
@@ -79,6 +84,7 @@ def update_teacher(id: int, update_validate: schemas.TeacherUpdate, db: Session
     # Commit the changes and refresh the instance
     db.commit()
     db.refresh(existing_user)
+    invalidate_teacher(existing_user.user_id)
 
     return existing_user
     
@@ -97,23 +103,42 @@ def delete_teacher(id: int, db: Session = Depends(get_db), admin_id = Depends(is
         )
 
     # Delete the teacher
+    teacher_user_id = existing_user.user_id
     db.delete(existing_user)
     db.commit()
+    invalidate_teacher(teacher_user_id)
+    assignments.discard_teacher(id)
+    bump("courses")
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
-@router.get('/', status_code=status.HTTP_200_OK, response_model=List[schemas.TeacherResponse])
-def get_teachers(db: Session = Depends(get_db), admin_id = Depends(is_admin)):
+# Provision teachers, creating their user accounts where missing, from an uploaded CSV (with header)
+# or NDJSON file. The report is streamed back as NDJSON, one line per row.
+@router.post('/import', status_code=status.HTTP_200_OK)
+def bulk_provision_teachers(file: UploadFile = File(...), format: str = Query(None, pattern=f"^({'|'.join(IMPORT_FORMATS)})$"),
+                      admin_id = Depends(is_admin)):
 
-    display_all_teacher = db.query(models.Teacher).all()
+    fmt = import_format(file.filename, format)
+    return stream_import(file, lambda db, lines: provision_profiles(db, lines, fmt, "teacher"),
+                         on_created=lambda result: invalidate_teacher(result["user_id"]))
 
-    if not display_all_teacher:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, 
-            detail=f"There no teacher assigned in our database"
-        )
-    
-    return display_all_teacher
+
+@router.get('/', status_code=status.HTTP_200_OK, response_model=schemas.ListAllTeachers)
+def get_teachers(department: Optional[str] = None, page: PageParams = Depends(), db: Session = Depends(get_db), admin_id = Depends(is_admin)):
+
+    query = db.query(models.Teacher).options(joinedload(models.Teacher.user))
+
+    # Optional filters
+    if department:
+        query = query.filter(models.Teacher.department == department)
+
+    display_all_teacher, next_cursor = paginate(query, models.Teacher, {
+        "id": models.Teacher.id,
+        "hire_date": models.Teacher.hire_date,
+        "department": models.Teacher.department
+    }, page)
+
+    return schemas.ListAllTeachers(count=len(display_all_teacher), next_cursor=next_cursor, teachers=display_all_teacher)
 
 
 @router.get('/{id}', status_code=status.HTTP_201_CREATED, response_model=schemas.TeacherResponse)
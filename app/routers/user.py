@@ -1,8 +1,12 @@
 from .. import models, schemas, utils, oauth2
-from fastapi import FastAPI, Response, HTTPException, status, APIRouter, Depends
+from ..assignments import assignments
+from ..gradebook import gradebooks, invalidate_student_gradebooks
+from ..response_cache import bump
+from ..imports import IMPORT_FORMATS, import_format, import_users, stream_import
+from fastapi import FastAPI, Response, HTTPException, status, APIRouter, Depends, File, UploadFile, Query
 from ..database import get_db
 from sqlalchemy.orm import Session
-from .dependencies import is_admin
+from .dependencies import is_admin, invalidate_teacher, invalidate_student
 
 
 router = APIRouter(
@@ -13,17 +17,17 @@ router = APIRouter(
 
 @router.post('/', status_code=status.HTTP_201_CREATED, response_model=schemas.UserCreatedResponse)
 def create_user(user: schemas.UserCreate, db: Session = Depends(get_db), admin_id = Depends(is_admin)):
-    
-    # hashed password before storing it
-    hashed_password = utils.hash_password(user.password_hash)
-    user.password_hash = hashed_password
 
-    # Check if already user exist by 'Email'
-    user_exist = db.query(models.User).filter(models.User.email == user.email).first()
+    # Check if already user exist by 'Email' before paying for the hash
+    user_exist = db.query(models.User.id).filter(models.User.email == user.email).first()
     if user_exist:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail=f"Email already registered")
 
+    # hashed password before storing it
+    hashed_password = utils.hash_password(user.password_hash)
+    user.password_hash = hashed_password
+
     new_user = models.User(**user.dict())  # Create a new user object from the schema
     db.add(new_user)
     db.commit()
@@ -32,6 +36,16 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db), admin_i
     return new_user
 
 
+# Import users from an uploaded CSV (with header) or NDJSON file. Results are streamed back as
+# NDJSON, one line per row followed by a summary; rows with errors do not abort the import.
+@router.post('/import', status_code=status.HTTP_200_OK)
+def bulk_import_users(file: UploadFile = File(...), format: str = Query(None, pattern=f"^({'|'.join(IMPORT_FORMATS)})$"),
+                      admin_id = Depends(is_admin)):
+
+    fmt = import_format(file.filename, format)
+    return stream_import(file, lambda db, lines: import_users(db, lines, fmt))
+
+
 @router.get('/{id}', status_code=status.HTTP_200_OK, response_model=schemas.UserCreatedResponse)
 def get_user(id: int, db: Session = Depends(get_db), admin_id = Depends(is_admin)):
 
@@ -74,6 +88,9 @@ def update_user(user: schemas.UserUpdate, id: int, db: Session = Depends(get_db)
     update_data = user.dict(exclude_unset=True)
     user_query.update(update_data, synchronize_session=False)
     db.commit()
+    if update_data.keys() & {"first_name", "last_name", "email"}:
+        invalidate_student_gradebooks(id, db)
+    bump("courses", "students")
 
     # Return the updated user object
     updated_user = user_query.first()
@@ -94,6 +111,13 @@ def delete_user(id: int, db: Session = Depends(get_db), admin_id = Depends(is_ad
     db.delete(user_query)
     db.commit()
 
+    # Deleting the user cascades to its teacher/student records
+    invalidate_teacher(id)
+    invalidate_student(id)
+    assignments.clear()
+    gradebooks.clear()
+    bump("courses", "students")
+
     return {"detail": "User deleted successfully"}
 
 
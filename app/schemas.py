@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, conint
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime, date
 
 # Schemas for creating a new user
@@ -52,6 +52,13 @@ class StudentCreate(BaseModel):
     current_grade_level: conint(ge=1, le=10)  # Restricted the level values between 1 and 10
     guardian_email: EmailStr
 
+# A student record for bulk provisioning; the user account is created from the
+# guardian email when it does not exist yet
+class StudentProvision(StudentCreate):
+    password: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+
 class StudentUpdate(BaseModel):
     date_of_birth: Optional[date] = None
     enrollment_date: Optional[date] = None
@@ -77,6 +84,11 @@ class StudentUpdatedResponse(StudentResponse):
     class Config:
         from_attributes = True
 
+class ListAllStudents(BaseModel):
+    count: int  # Items on this page, at most `limit`
+    next_cursor: Optional[str] = None
+    students: List[StudentResponse]
+
 
 class CreateGrade(BaseModel):
     student_id: int
@@ -108,11 +120,60 @@ class UpdateGrade(BaseModel):
     grade: Optional[str] = None
     comments: Optional[str] = None
 
+# GPA per term and cumulative, read from the per term summary rows
+class TermGPA(BaseModel):
+    term: str
+    term_start: date
+    graded_courses: int
+    gpa: Optional[float] = None
+
+class Transcript(BaseModel):
+    student_id: int
+    cumulative_gpa: Optional[float] = None # None until a grade with a point value is recorded
+    graded_courses: int
+    terms: List[TermGPA]
+
+# Course gradebook: every enrolled student with their grade, and the course's grade distribution
+class GradebookEntry(BaseModel):
+    student_id: int
+    first_name: str
+    last_name: str
+    email: str
+    grade_id: Optional[int] = None
+    grade: Optional[str] = None # None when the student has not been graded yet
+    graded_at: Optional[date] = None
+
+class GradebookStatistics(BaseModel):
+    enrolled: int
+    graded: int
+    missing: int
+    distribution: Dict[str, int] # Count per letter grade
+    numeric_graded: int
+    mean: Optional[float] = None # Over numeric grades only
+    median: Optional[float] = None
+
+class CourseGradebook(BaseModel):
+    course_id: int
+    course_name: str
+    students: List[GradebookEntry]
+    statistics: GradebookStatistics
+
 class TeacherCreate(BaseModel):
     user_id: int
     hire_date: date
     department: str
 
+# A teacher record for bulk provisioning, referring to an existing user by user_id
+# or email, or carrying the fields to create the user account
+class TeacherProvision(BaseModel):
+    user_id: Optional[int] = None
+    email: Optional[EmailStr] = None
+    password: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    hire_date: date
+    department: str
+
 class TeacherResponse(BaseModel):
     id: int
     user_id: int
@@ -125,6 +186,11 @@ class TeacherResponse(BaseModel):
     class Config:
         from_attributes = True
     
+class ListAllTeachers(BaseModel):
+    count: int  # Items on this page, at most `limit`
+    next_cursor: Optional[str] = None
+    teachers: List[TeacherResponse]
+
 class TeacherUpdate(BaseModel):
     hire_date: Optional[date] = None
     department: Optional[str] = None  
@@ -137,6 +203,7 @@ class AttendanceRequest(BaseModel):
     student_id: int
     course_id: int
     status: Optional[str] = "Present" # By default all students present
+    attendance_date: Optional[date] = None # Session date, today when omitted
 
 class AttendanceResponse(BaseModel):
     id: int
@@ -173,6 +240,54 @@ class SimpleAttendanceResponse(BaseModel):
         from_attributes = True
 
 
+class BulkAttendanceRecord(BaseModel):
+    student_id: int
+    status: Optional[str] = "Present" # By default all students present
+
+class BulkAttendanceRequest(BaseModel):
+    course_id: int
+    attendance_date: Optional[date] = None # Session date, today when omitted
+    records: List[BulkAttendanceRecord]
+
+class BulkAttendanceError(BaseModel):
+    student_id: int
+    detail: str
+
+class BulkAttendanceResponse(BaseModel):
+    course_id: int
+    attendance_date: date
+    inserted: int
+    attendance_records: List[SimpleAttendanceResponse]
+    errors: List[BulkAttendanceError]
+
+
+# Absence rates served from the weekly attendance rollup
+class AbsenceRate(BaseModel):
+    student_id: int
+    first_name: str
+    last_name: str
+    email: str
+    course_id: Optional[int] = None # None when ranked across all courses
+    sessions: int
+    absent: int
+    late: int
+    excused: int
+    absence_rate: float
+
+class AbsenceLeaderboard(BaseModel):
+    start_date: date # Monday of the first week counted
+    end_date: date
+    course_id: Optional[int] = None
+    students: List[AbsenceRate]
+
+class AbsenceAlerts(BaseModel):
+    threshold: float
+    start_date: date
+    end_date: date
+    total: int
+    alerts: List[AbsenceRate]
+
+
 class GetAttendanceResponse(BaseModel):
     id: int
     student_id: int
@@ -221,7 +336,8 @@ class CourseUpdate(BaseModel):
 
 
 class ListAllCourses(BaseModel):
-    total: int
+    count: int  # Items on this page, at most `limit`
+    next_cursor: Optional[str] = None
     courses: List[CourseResponse]
 
 
@@ -257,6 +373,27 @@ class EnrollmentResponseList(BaseModel):
     enrollment_records: List[EnrollmentResponse]
 
 
+# Enroll a cohort of students into a course with one teacher
+class BulkEnrollmentRequest(BaseModel):
+    course_id: int
+    teacher_id: int
+    enrollment_date: date
+    student_ids: List[int]
+
+class BulkEnrollmentError(BaseModel):
+    student_id: int
+    detail: str
+
+class BulkEnrollmentResponse(BaseModel):
+    course_id: int
+    teacher_id: int
+    enrollment_date: date
+    inserted: int
+    skipped: int # Already enrolled, or listed more than once
+    enrolled_student_ids: List[int]
+    errors: List[BulkEnrollmentError]
+
+
 class StudentAttendanceResponse(BaseModel):
     id: int
     course_name: str
@@ -273,4 +410,8 @@ class TokenData(BaseModel):
     
 class Token(BaseModel):
     access_token: str
-    token_type: str
\ No newline at end of file
+    token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
\ No newline at end of file
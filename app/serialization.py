@@ -0,0 +1,26 @@
+from decimal import Decimal
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+# orjson encodes dicts, lists, dates and datetimes itself; this covers the rest of what handlers return
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# UTC datetimes end in "Z" as in pydantic's own JSON
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+# Default response class of the application. The list routes return it directly with plain dicts mapped
+# from their query rows, which skips FastAPI's validation of the result against response_model (the
+# model still documents the route) and the per row pydantic objects.
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
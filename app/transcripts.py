@@ -0,0 +1,150 @@
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterable, Optional
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from . import models, schemas
+from .config import settings
+
+
+NUMERIC_GRADE_SCALE = sorted(settings.NUMERIC_GRADE_SCALE, reverse=True)
+TERM_START_MONTHS = sorted(settings.TERM_START_MONTHS.items())
+
+
+# Points of a grade on the configured scale, None for grades that don't count (e.g. "P" or "Incomplete")
+def grade_points(grade: Optional[str]) -> Optional[Decimal]:
+    if grade is None:
+        return None
+    grade = grade.strip().upper()
+    if grade in settings.GRADE_SCALE:
+        return Decimal(str(settings.GRADE_SCALE[grade]))
+    try:
+        score = float(grade)
+    except ValueError:
+        return None
+    for minimum, points in NUMERIC_GRADE_SCALE:
+        if score >= minimum:
+            return Decimal(str(points))
+    return None
+
+
+# First day of the term a day falls in; before the first term start month it's last year's final term
+def term_start(day: date) -> date:
+    if isinstance(day, datetime):
+        day = day.date()
+    starts = [month for month, _ in TERM_START_MONTHS if month <= day.month]
+    if starts:
+        return date(day.year, starts[-1], 1)
+    return date(day.year - 1, TERM_START_MONTHS[-1][0], 1)
+
+
+def term_name(start: date) -> str:
+    return f"{settings.TERM_START_MONTHS[start.month]} {start.year}"
+
+
+# Apply grade changes to the per term summary in the caller's transaction. Each change is
+# (student_id, graded_at, grade, delta) with delta +1 for an added grade and -1 for a removed one.
+# Changes are merged per term and applied as increments, so concurrent grade writes can't lose updates;
+# callers changing or removing a grade hold its row lock, so the old grade they pass is the current one.
+def apply_grade_changes(db: Session, changes: Iterable[tuple]):
+    deltas = defaultdict(lambda: {"points": Decimal(0), "graded_courses": 0})
+    for student_id, graded_at, grade, delta in changes:
+        points = grade_points(grade)
+        if points is None:
+            continue
+        counts = deltas[(student_id, term_start(graded_at))]
+        counts["points"] += points * delta
+        counts["graded_courses"] += delta
+
+    rows = [
+        {"student_id": student_id, "term_start": start, **counts}
+        for (student_id, start), counts in deltas.items()
+        if counts["graded_courses"] or counts["points"]
+    ]
+    if not rows:
+        return
+
+    summary = models.StudentTermGPA.__table__
+    statement = insert(summary).values(rows)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=['student_id', 'term_start'],
+        set_={column: summary.c[column] + statement.excluded[column] for column in ("points", "graded_courses")}
+    ))
+
+
+def record_grade(db: Session, grade: models.Grade):
+    apply_grade_changes(db, [(grade.student_id, grade.graded_at, grade.grade, 1)])
+
+
+def change_grade(db: Session, grade: models.Grade, old_grade: Optional[str]):
+    apply_grade_changes(db, [
+        (grade.student_id, grade.graded_at, old_grade, -1),
+        (grade.student_id, grade.graded_at, grade.grade, 1),
+    ])
+
+
+def remove_grade(db: Session, grade: models.Grade):
+    apply_grade_changes(db, [(grade.student_id, grade.graded_at, grade.grade, -1)])
+
+
+def transcript_statement(student_id: int):
+    return select(models.StudentTermGPA).where(
+        models.StudentTermGPA.student_id == student_id
+    ).order_by(models.StudentTermGPA.term_start)
+
+
+def _gpa(points: Decimal, graded_courses: int) -> Optional[float]:
+    return round(float(points) / graded_courses, 2) if graded_courses else None
+
+
+# Per term and cumulative GPA from a student's summary rows
+def build_transcript(student_id: int, terms: list) -> schemas.Transcript:
+    points = sum((term.points for term in terms), Decimal(0))
+    graded_courses = sum(term.graded_courses for term in terms)
+    return schemas.Transcript(
+        student_id=student_id,
+        cumulative_gpa=_gpa(points, graded_courses),
+        graded_courses=graded_courses,
+        terms=[
+            schemas.TermGPA(
+                term=term_name(term.term_start),
+                term_start=term.term_start,
+                graded_courses=term.graded_courses,
+                gpa=_gpa(term.points, term.graded_courses)
+            )
+            for term in terms if term.graded_courses
+        ]
+    )
+
+
+# Recompute every summary row from the grades, e.g. after the grade scale or the terms changed
+def rebuild_term_gpa(connection: Connection):
+    deltas = defaultdict(lambda: {"points": Decimal(0), "graded_courses": 0})
+    result = connection.execute(
+        select(models.Grade.student_id, models.Grade.graded_at, models.Grade.grade)
+        .where(models.Grade.graded_at.isnot(None))
+        .execution_options(yield_per=10000)
+    )
+    for student_id, graded_at, grade in result:
+        points = grade_points(grade)
+        if points is not None:
+            counts = deltas[(student_id, term_start(graded_at))]
+            counts["points"] += points
+            counts["graded_courses"] += 1
+
+    connection.execute(delete(models.StudentTermGPA))
+    rows = [{"student_id": student_id, "term_start": start, **counts} for (student_id, start), counts in deltas.items()]
+    for offset in range(0, len(rows), 1000):
+        connection.execute(models.StudentTermGPA.__table__.insert(), rows[offset:offset + 1000])
+
+
+# Rebuild the summary after changing GRADE_SCALE, NUMERIC_GRADE_SCALE or TERM_START_MONTHS:
+#   python -m app.transcripts
+if __name__ == "__main__":
+    from .database import engine
+
+    with engine.begin() as connection:
+        rebuild_term_gpa(connection)
@@ -1,7 +1,12 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+from .config import settings
 
-# Use bcrypt algorithm for password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated='auto')
+# Use bcrypt algorithm for password hashing, hashes made with another cost are flagged by needs_update()
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated='auto', bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 # Function to hash a plain-text password
 def hash_password(password: str):
@@ -9,4 +14,64 @@ def hash_password(password: str):
 
 # Function to verify a plain-text password against a hashed password
 def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    return pwd_context.verify(plain_password, hashed_password)
+
+# Verify a password and return (valid, new_hash); new_hash is set when the stored hash uses an outdated cost
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# bcrypt is CPU bound and holds the GIL, so logins are verified in a dedicated process pool
+# instead of the request threadpool. The semaphore bounds how many verifications may wait for it;
+# both belong to one run of the application (see the lifespan in main.py), as the semaphore is
+# bound to the event loop that serves it.
+_hash_executor = None
+_hash_slots = None
+
+
+def _hash_workers() -> int:
+    return settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+
+
+def get_hash_executor() -> ProcessPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ProcessPoolExecutor(max_workers=_hash_workers())
+    return _hash_executor
+
+
+# Called on startup from the running event loop; the pool's processes only start on the first login
+def start_hash_executor():
+    global _hash_slots
+    get_hash_executor()
+    _hash_slots = asyncio.Semaphore(_hash_workers() * settings.PASSWORD_HASH_QUEUE_PER_WORKER)
+
+
+def shutdown_hash_executor():
+    global _hash_executor, _hash_slots
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+    _hash_slots = None
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str):
+    # Applications served without their lifespan (e.g. a TestClient used outside `with`)
+    if _hash_slots is None:
+        start_hash_executor()
+
+    # Shed load instead of queueing without bound when every slot is taken
+    try:
+        await asyncio.wait_for(_hash_slots.acquire(), timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_hash_executor(), verify_and_update_password, plain_password, hashed_password)
+    finally:
+        _hash_slots.release()
@@ -0,0 +1,55 @@
+"""Compare two benchmark suite results route by route.
+
+Prints throughput, p95/p99 latency and SQL statements per request of each
+route present in both files, with the relative change:
+
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+"""
+import argparse
+import json
+
+
+def change(before: float, after: float) -> str:
+    if not before:
+        return ""
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def compare(before: dict, after: dict) -> list:
+    previous = {result["route"]: result for result in before["routes"]}
+    rows = []
+    for result in after["routes"]:
+        old = previous.get(result["route"])
+        if old is None:
+            continue
+        row = [result["route"]]
+        for value in (
+            lambda r: r["throughput_rps"],
+            lambda r: r["latency_ms"]["p95"],
+            lambda r: r["latency_ms"]["p99"],
+            lambda r: r.get("sql_statements"),
+        ):
+            if value(old) is None or value(result) is None:
+                row.append("")
+            else:
+                row.append(f"{value(old)} -> {value(result)} {change(value(old), value(result))}".strip())
+        rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before) as file:
+        before = json.load(file)
+    with open(args.after) as file:
+        after = json.load(file)
+
+    rows = [["route", "throughput (rps)", "p95 (ms)", "p99 (ms)", "sql statements"]] + compare(before, after)
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    print(f"{(before['commit'] or 'unknown')[:12]} -> {(after['commit'] or 'unknown')[:12]}")
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
@@ -0,0 +1,93 @@
+"""Closed-loop HTTP load test.
+
+Keeps --concurrency clients busy against each path for --duration seconds and
+prints throughput and latency percentiles as JSON. Run it against the same
+routes on two commits (e.g. before and after the async handlers) to compare:
+
+    python -m benchmarks.load_test --email admin@example.com --password secret \
+        --concurrency 500 --path /admin-course/1 --path /admin/enroll-student/1
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post("/login", data={"username": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+# Each worker sends its next request as soon as the previous one completes. `request` is passed
+# on to httpx (headers, json or form data)
+async def run_path(client: httpx.AsyncClient, path: str, concurrency: int, duration: float, method: str = "GET", **request) -> dict:
+    latencies = []
+    statuses = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **request)
+                code = str(response.status_code)
+            except httpx.HTTPError as exc:
+                code = type(exc).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[code] = statuses.get(code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "method": method,
+        "path": path,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+        },
+        "status_codes": statuses,
+    }
+
+
+async def main(args) -> list:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        token = args.token or await login(client, args.email, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+        return [await run_path(client, path, args.concurrency, args.duration) for path in args.path]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", help="Bearer token, instead of logging in with --email/--password")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--path", action="append", required=True, help="GET path to load, can be repeated")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per path")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    if not args.token and not (args.email and args.password):
+        parser.error("either --token or --email and --password are required")
+
+    print(json.dumps(asyncio.run(main(args)), indent=2))
@@ -0,0 +1,53 @@
+"""Login password verification throughput.
+
+Measures bcrypt verifications per second on one core and across a process
+pool (what /login does) for each bcrypt cost, and prints the results as JSON:
+
+    python -m benchmarks.password_hashing --rounds 10 --rounds 12 --verifications 200
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+PASSWORD = "benchmark-password"
+
+
+def _verify(hashed: str) -> bool:
+    return CryptContext(schemes=["bcrypt"]).verify(PASSWORD, hashed)
+
+
+def measure(rounds: int, verifications: int, workers: int) -> dict:
+    hashed = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds).hash(PASSWORD)
+
+    started = time.perf_counter()
+    for _ in range(verifications):
+        _verify(hashed)
+    single = verifications / (time.perf_counter() - started)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(_verify, [hashed] * workers))  # Start the workers before timing
+        started = time.perf_counter()
+        list(executor.map(_verify, [hashed] * verifications))
+        pooled = verifications / (time.perf_counter() - started)
+
+    return {
+        "rounds": rounds,
+        "workers": workers,
+        "logins_per_second_single_core": round(single, 1),
+        "logins_per_second_pool": round(pooled, 1),
+        "logins_per_second_per_core": round(pooled / workers, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, action="append", help="bcrypt cost to measure, can be repeated (default 10, 11, 12)")
+    parser.add_argument("--verifications", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(json.dumps([measure(rounds, args.verifications, args.workers) for rounds in args.rounds or [10, 11, 12]], indent=2))
@@ -0,0 +1,194 @@
+"""Synthetic institution for the benchmark suite.
+
+Seeds the database configured in .env (run `alembic upgrade head` first) with an
+admin, teachers, courses, students, enrollments, weekly attendance and grades,
+then writes a manifest with the accounts and ids benchmarks/suite.py drives:
+
+    python -m benchmarks.seed --students 100000 --manifest benchmarks/results/seed.json
+
+The rows are generated from --seed, so the same arguments give the same
+institution. Everything is loaded with COPY using ids after the current maximum
+of each table, so seeding again adds a second institution instead of failing.
+"""
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import random
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.config import settings
+from app.imports import chunked
+from app.partitions import ensure_attendance_partitions
+from app.rollups import rebuild_attendance_summary
+from app.transcripts import rebuild_term_gpa
+from app.utils import hash_password
+
+# Students generated and copied at a time, with their enrollments, attendance and grades
+STUDENT_BATCH = 5000
+COPY_CHUNK_SIZE = 100000
+
+FIRST_NAMES = ["Amina", "Ben", "Chen", "Dara", "Elif", "Femi", "Gus", "Hana", "Ivan", "Jon", "Kofi", "Lea", "Mina", "Nils", "Omar", "Pia"]
+LAST_NAMES = ["Ahmed", "Baker", "Costa", "Diallo", "Evans", "Fischer", "Garcia", "Haddad", "Ito", "Jensen", "Kim", "Lopez", "Moreau", "Novak"]
+DEPARTMENTS = ["Mathematics", "Physics", "Chemistry", "Biology", "History", "Literature", "Computer Science", "Economics"]
+STATUSES = ["present", "absent", "late", "excused"]
+STATUS_WEIGHTS = [85, 8, 5, 2]
+
+
+def copy_rows(cursor, table: str, columns: tuple, rows) -> int:
+    count = 0
+    for chunk in chunked(rows, COPY_CHUNK_SIZE):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(chunk)
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        count += len(chunk)
+    return count
+
+
+def name(rng: random.Random) -> tuple:
+    return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+
+# The latest session of a course on or before today; each course meets weekly on its own weekday
+def last_session(course_index: int, today: date) -> date:
+    return today - timedelta(days=(today.weekday() - course_index % 5) % 7)
+
+
+def seed(connection: Connection, students: int, students_per_teacher: int, courses_per_teacher: int,
+         courses_per_student: int, sessions: int, seed: int, password: str) -> dict:
+    rng = random.Random(seed)
+    today = date.today()
+    cursor = connection.connection.cursor()
+
+    # Loading a large institution takes longer than the application's statement timeout
+    connection.execute(text("SET LOCAL statement_timeout = 0"))
+    connection.execute(text("INSERT INTO roles (id, role_name) VALUES (1, 'Admin'), (2, 'Teacher'), (3, 'Student') ON CONFLICT DO NOTHING"))
+
+    last_id = {
+        table: connection.execute(text(f"SELECT coalesce(max(id), 0) FROM {table}")).scalar()
+        for table in ("users", "teachers", "courses", "students")
+    }
+    last_course_code = connection.execute(text("SELECT coalesce(max(course_code), 0) FROM courses")).scalar()
+
+    teachers = max(1, math.ceil(students / students_per_teacher))
+    courses = teachers * courses_per_teacher
+    courses_per_student = min(courses_per_student, courses)
+    password_hash = hash_password(password)
+
+    admin_user_id = last_id["users"] + 1
+    teacher_user_id = lambda index: admin_user_id + 1 + index
+    student_user_id = lambda index: admin_user_id + 1 + teachers + index
+    teacher_id = lambda index: last_id["teachers"] + 1 + index
+    course_id = lambda index: last_id["courses"] + 1 + index
+    student_id = lambda index: last_id["students"] + 1 + index
+    email = lambda kind, user_id: f"bench-{kind}-{user_id}@example.com"
+
+    first_session = min(last_session(index, today) for index in range(min(courses, 5))) - timedelta(weeks=sessions - 1)
+    ensure_attendance_partitions(connection, start=first_session)
+
+    # Staff and courses
+    copy_rows(cursor, "users", ("id", "email", "password_hash", "first_name", "last_name", "role_id"), [
+        (admin_user_id, email("admin", admin_user_id), password_hash, "Bench", "Admin", 1)
+    ] + [
+        (teacher_user_id(index), email("teacher", teacher_user_id(index)), password_hash, *name(rng), 2)
+        for index in range(teachers)
+    ])
+    copy_rows(cursor, "teachers", ("id", "user_id", "hire_date", "department"), (
+        (teacher_id(index), teacher_user_id(index), today - timedelta(days=rng.randint(30, 3650)), rng.choice(DEPARTMENTS))
+        for index in range(teachers)
+    ))
+    copy_rows(cursor, "courses", ("id", "course_name", "course_code", "description", "teacher_id"), (
+        (course_id(index), f"{DEPARTMENTS[index % len(DEPARTMENTS)]} {index + 1}", last_course_code + index + 1,
+         "Synthetic benchmark course", teacher_id(index // courses_per_teacher))
+        for index in range(courses)
+    ))
+
+    # Students in batches, with their enrollments, a weekly attendance record per session and a grade per course
+    for first in range(0, students, STUDENT_BATCH):
+        batch = range(first, min(first + STUDENT_BATCH, students))
+        users, profiles, enrollments, attendance, grades = [], [], [], [], []
+
+        for index in batch:
+            user_id = student_user_id(index)
+            users.append((user_id, email("student", user_id), password_hash, *name(rng), 3))
+            profiles.append((
+                student_id(index), user_id, today - timedelta(days=rng.randint(18 * 365, 24 * 365)),
+                today - timedelta(days=rng.randint(30, 1000)), rng.randint(1, 10), email("student", user_id)
+            ))
+
+            enrolled = rng.sample(range(courses), courses_per_student)
+            if index == 0 and 0 not in enrolled:
+                enrolled[0] = 0  # The manifest's student is enrolled in the manifest's course
+            for course in enrolled:
+                latest = last_session(course, today)
+                enrollments.append((student_id(index), course_id(course), teacher_id(course // courses_per_teacher),
+                                    latest - timedelta(weeks=sessions)))
+                attendance.extend(
+                    (student_id(index), course_id(course), latest - timedelta(weeks=week), status)
+                    for week, status in enumerate(rng.choices(STATUSES, STATUS_WEIGHTS, k=sessions))
+                )
+                grade = rng.choice(list(settings.GRADE_SCALE)) if rng.random() < 0.7 else str(rng.randint(50, 100))
+                graded_at = datetime.combine(today - timedelta(days=rng.randint(0, 365)), time(12), tzinfo=timezone.utc)
+                grades.append((student_id(index), course_id(course), grade, graded_at.isoformat()))
+
+        copy_rows(cursor, "users", ("id", "email", "password_hash", "first_name", "last_name", "role_id"), users)
+        copy_rows(cursor, "students", ("id", "user_id", "date_of_birth", "enrollment_date", "current_grade_level", "guardian_email"), profiles)
+        copy_rows(cursor, "student_courses", ("student_id", "course_id", "teacher_id", "enrollment_date"), enrollments)
+        copy_rows(cursor, "attendance", ("student_id", "course_id", "attendance_date", "status"), attendance)
+        copy_rows(cursor, "grades", ("student_id", "course_id", "grade", "graded_at"), grades)
+
+    # The explicit ids bypassed the sequences
+    for table in last_id:
+        connection.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"))
+
+    rebuild_attendance_summary(connection, first_session, today)
+    rebuild_term_gpa(connection)
+    connection.execute(text("ANALYZE"))
+
+    grade_id = connection.execute(text("SELECT min(id) FROM grades WHERE student_id = :student_id AND course_id = :course_id"),
+                                  {"student_id": student_id(0), "course_id": course_id(0)}).scalar()
+    return {
+        "seed": seed,
+        "password": password,
+        "scale": {
+            "users": 1 + teachers + students, "teachers": teachers, "courses": courses, "students": students,
+            "enrollments": students * courses_per_student, "attendance": students * courses_per_student * sessions,
+            "grades": students * courses_per_student,
+        },
+        "admin": {"email": email("admin", admin_user_id), "user_id": admin_user_id},
+        "teacher": {
+            "email": email("teacher", teacher_user_id(0)), "teacher_id": teacher_id(0), "course_id": course_id(0),
+            "student_id": student_id(0), "grade_id": grade_id, "attendance_date": last_session(0, today).isoformat(),
+        },
+        "student": {"email": email("student", student_user_id(0)), "user_id": student_user_id(0), "student_id": student_id(0)},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--students-per-teacher", type=int, default=25)
+    parser.add_argument("--courses-per-teacher", type=int, default=2)
+    parser.add_argument("--courses-per-student", type=int, default=4)
+    parser.add_argument("--sessions", type=int, default=10, help="Weekly attendance sessions per enrollment")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default="benchmark-password", help="Password of every seeded account")
+    parser.add_argument("--manifest", default="benchmarks/results/seed.json")
+    args = parser.parse_args()
+
+    from app.database import engine
+
+    with engine.begin() as connection:
+        manifest = seed(connection, args.students, args.students_per_teacher, args.courses_per_teacher,
+                        args.courses_per_student, args.sessions, args.seed, args.password)
+
+    os.makedirs(os.path.dirname(args.manifest) or ".", exist_ok=True)
+    with open(args.manifest, "w") as file:
+        json.dump(manifest, file, indent=2)
+    print(json.dumps(manifest["scale"], indent=2))
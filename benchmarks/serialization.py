@@ -0,0 +1,168 @@
+"""Per row cost of encoding the large list responses.
+
+Compares, for --rows query rows of the attendance by course, course list and
+student grades routes, building pydantic objects per row and letting
+FastAPI validate them against response_model and encode them with the stdlib
+encoder (the previous path) with mapping the rows to plain dicts encoded by
+FastJSONResponse (what the list routes do now). Both bodies are checked to
+decode to the same document. No database is needed:
+
+    python -m benchmarks.serialization --rows 5000
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app import schemas
+from app.serialization import FastJSONResponse
+
+AttendanceRow = namedtuple("AttendanceRow", "id student_id course_id attendance_date status first_name last_name email")
+CourseRow = namedtuple("CourseRow", "id course_name course_code description")
+UserRow = namedtuple("UserRow", "id first_name last_name email")
+GradeRow = namedtuple("GradeRow", "id student_id course_id grade comments graded_at course_name")
+
+GRADES = ("A", "B+", "C-", "87", "92.5", "F")
+
+
+def attendance_rows(count: int) -> list:
+    return [
+        AttendanceRow(index, index % 500, 1, date(2024, 1, 1) + timedelta(days=index % 120), "absent",
+                      "Amina", "Diallo", f"student{index % 500}@example.com")
+        for index in range(count)
+    ]
+
+
+def course_rows(count: int) -> list:
+    return [
+        (CourseRow(index, f"Course {index}", 1000 + index, "Synthetic benchmark course"),
+         UserRow(index % 50, "Ben", "Costa", f"teacher{index % 50}@example.com"))
+        for index in range(count)
+    ]
+
+
+def attendance_models(rows: list):
+    return schemas.ListAttendanceResponse(total=len(rows), message="Course name: Physics", attendance_records=[
+        schemas.AttendanceResponse(
+            id=row.id, student_id=row.student_id, first_name=row.first_name, last_name=row.last_name,
+            email=row.email, course_id=row.course_id, attendance_date=row.attendance_date, status=row.status
+        )
+        for row in rows
+    ])
+
+
+def attendance_dicts(rows: list) -> dict:
+    return {"total": len(rows), "message": "Course name: Physics", "attendance_records": [
+        {
+            "id": row.id, "student_id": row.student_id, "first_name": row.first_name, "last_name": row.last_name,
+            "email": row.email, "course_id": row.course_id, "attendance_date": row.attendance_date, "status": row.status
+        }
+        for row in rows
+    ]}
+
+
+def course_models(rows: list):
+    return schemas.ListAllCourses(count=len(rows), next_cursor=None, courses=[
+        schemas.CourseResponse(
+            id=course.id, course_name=course.course_name, course_code=course.course_code, description=course.description,
+            teacher=schemas.TeacherInfo(id=user.id, first_name=user.first_name, last_name=user.last_name, email=user.email)
+        )
+        for course, user in rows
+    ])
+
+
+def course_dicts(rows: list) -> dict:
+    return {"count": len(rows), "next_cursor": None, "courses": [
+        {
+            "id": course.id, "course_name": course.course_name, "course_code": course.course_code, "description": course.description,
+            "teacher": {"id": user.id, "first_name": user.first_name, "last_name": user.last_name, "email": user.email}
+        }
+        for course, user in rows
+    ]}
+
+
+def grade_rows(count: int) -> list:
+    return [
+        GradeRow(index, 7, index % 40, GRADES[index % len(GRADES)], "Synthetic benchmark grade",
+                 datetime(2024, 1, 1, 9, 30, tzinfo=timezone.utc) + timedelta(days=index % 120), f"Course {index % 40}")
+        for index in range(count)
+    ]
+
+
+def grade_models(rows: list):
+    return [
+        schemas.ResponseGrade(
+            id=grade.id, student_id=grade.student_id, course_id=grade.course_id, grade=grade.grade,
+            comments=grade.comments, graded_at=grade.graded_at.date()
+        )
+        for grade in rows
+    ]
+
+
+def grade_dicts(rows: list) -> list:
+    return [
+        {
+            "student_id": grade.student_id, "course_id": grade.course_id, "grade": grade.grade,
+            "comments": grade.comments, "id": grade.id, "graded_at": grade.graded_at.date()
+        }
+        for grade in rows
+    ]
+
+
+CASES = {
+    "attendance_by_course": (schemas.ListAttendanceResponse, attendance_rows, attendance_models, attendance_dicts),
+    "all_courses": (schemas.ListAllCourses, course_rows, course_models, course_dicts),
+    "own_grades": (List[schemas.ResponseGrade], grade_rows, grade_models, grade_dicts),
+}
+
+
+async def previous_path(field, build, rows) -> bytes:
+    content = await serialize_response(field=field, response_content=build(rows))
+    return JSONResponse(content).body
+
+
+def fast_path(build, rows) -> bytes:
+    return FastJSONResponse(build(rows)).body
+
+
+async def measure(name: str, count: int, repeat: int) -> dict:
+    response_model, make_rows, build_models, build_dicts = CASES[name]
+    field = create_model_field(name="Response", type_=response_model, mode="serialization")
+    rows = make_rows(count)
+
+    if json.loads(await previous_path(field, build_models, rows)) != json.loads(fast_path(build_dicts, rows)):
+        raise SystemExit(f"{name}: the two paths produce different documents")
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await previous_path(field, build_models, rows)
+    previous = (time.perf_counter() - started) / repeat
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fast_path(build_dicts, rows)
+    fast = (time.perf_counter() - started) / repeat
+
+    return {
+        "response": name,
+        "rows": count,
+        "previous_us_per_row": round(previous / count * 1e6, 2),
+        "fast_us_per_row": round(fast / count * 1e6, 2),
+        "speedup": round(previous / fast, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps([asyncio.run(measure(name, args.rows, args.repeat)) for name in CASES], indent=2))
@@ -0,0 +1,60 @@
+"""Worker startup time.
+
+Starts --runs fresh interpreters, each importing the application and running
+its lifespan startup the way a new uvicorn or gunicorn worker does, and prints
+the import, startup and total (import-to-ready) times as JSON. No database
+connection is needed, startup doesn't open one:
+
+    python -m benchmarks.startup --runs 20
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from .load_test import percentile
+
+# Run in the child, so every sample pays for a cold import
+WORKER = """
+import asyncio, json, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def ready():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready_at = asyncio.run(ready())
+print(json.dumps({"import": imported - started, "startup": ready_at - imported, "total": ready_at - started}))
+"""
+
+
+def measure(runs: int) -> dict:
+    samples = {"import": [], "startup": [], "total": []}
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", WORKER], capture_output=True, text=True, check=True).stdout
+        for phase, seconds in json.loads(output.splitlines()[-1]).items():
+            samples[phase].append(seconds * 1000)
+
+    return {
+        "runs": runs,
+        **{
+            f"{phase}_ms": {
+                "mean": round(statistics.fmean(values), 1),
+                "p50": round(percentile(values, 50), 1),
+                "p95": round(percentile(values, 95), 1),
+                "max": round(max(values), 1),
+            }
+            for phase, values in samples.items()
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(json.dumps(measure(args.runs), indent=2))
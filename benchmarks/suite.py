@@ -0,0 +1,166 @@
+"""Benchmark suite covering every router.
+
+Drives each route of app/routers against a server running on a database
+seeded by benchmarks/seed.py, one route at a time with --concurrency
+closed-loop clients for --duration seconds. Then it sends every route once
+more through the application in this process to count the SQL statements it
+issues. Results are written as JSON so runs can be compared across commits
+with benchmarks/compare.py:
+
+    python -m benchmarks.seed --students 100000
+    uvicorn app.main:app --workers 4 &
+    python -m benchmarks.suite --concurrency 100 --duration 10
+
+The write routes are driven with updates that can be repeated (same status,
+same grade, re-enrolling an enrolled student). Creates, deletes, imports,
+/refresh and /logout are left out because they use up their data.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+from datetime import datetime, timezone
+
+import httpx
+
+from .load_test import login, run_path
+
+ROLES = ("admin", "teacher", "student")
+
+
+def route(role: str, method: str, template: str, request: dict = None, **params) -> dict:
+    return {"route": f"{method} {template}", "role": role, "method": method,
+            "path": template.format(**params), "request": request or {}}
+
+
+# Every benchmarked route, with the ids of the seeded institution filled in
+def routes(manifest: dict) -> list:
+    admin, teacher, student = manifest["admin"], manifest["teacher"], manifest["student"]
+    course_id = teacher["course_id"]
+    return [
+        route(None, "POST", "/login", {"data": {"username": student["email"], "password": manifest["password"]}}),
+
+        route("admin", "GET", "/users/{id}", id=admin["user_id"]),
+        route("admin", "PUT", "/users/{id}", {"json": {"first_name": "Bench"}}, id=admin["user_id"]),
+        route("admin", "GET", "/students/"),
+        route("admin", "GET", "/students/{id}", id=student["student_id"]),
+        route("admin", "GET", "/students/{id}/transcript", id=student["student_id"]),
+        route("admin", "PUT", "/students/{id}", {"json": {"guardian_email": student["email"]}}, id=student["student_id"]),
+        route("admin", "GET", "/teachers/"),
+        route("admin", "GET", "/teachers/{id}", id=teacher["teacher_id"]),
+        route("admin", "PUT", "/teachers/{id}", {"json": {"department": "Mathematics"}}, id=teacher["teacher_id"]),
+        route("admin", "GET", "/admin-course/"),
+        route("admin", "GET", "/admin-course/{course_id}", course_id=course_id),
+        route("admin", "PUT", "/admin-course/{course_id}", {"json": {"description": "Synthetic benchmark course"}}, course_id=course_id),
+        route("admin", "GET", "/admin/enroll-student/{course_id}", course_id=course_id),
+        route("admin", "POST", "/admin/enroll-student/bulk", {"json": {
+            "course_id": course_id, "teacher_id": teacher["teacher_id"],
+            "enrollment_date": teacher["attendance_date"], "student_ids": [teacher["student_id"]],
+        }}),
+        route("admin", "GET", "/admin/export/grades?course_id={course_id}", course_id=course_id),
+        route("admin", "GET", "/admin/export/attendance?course_id={course_id}", course_id=course_id),
+        route("admin", "GET", "/admin/export/enrollments?course_id={course_id}", course_id=course_id),
+        route("admin", "GET", "/admin/attendance-analytics/leaderboard"),
+        route("admin", "GET", "/admin/attendance-analytics/alerts"),
+        route("admin", "GET", "/admin/monitoring/caches"),
+        route("admin", "GET", "/admin/monitoring/pool"),
+
+        route("teacher", "GET", "/teachers-attendance/{course_id}", course_id=course_id),
+        route("teacher", "PUT", "/teachers-attendance/", {"json": {
+            "student_id": teacher["student_id"], "course_id": course_id,
+            "status": "present", "attendance_date": teacher["attendance_date"],
+        }}),
+        route("teacher", "PUT", "/teacher-grades/{grade_id}", {"json": {"comments": "Benchmark"}}, grade_id=teacher["grade_id"]),
+        route("teacher", "GET", "/teacher-grades/gradebook/{course_id}", course_id=course_id),
+
+        route("student", "GET", "/student-attendance/"),
+        route("student", "GET", "/student-grades/"),
+        route("student", "GET", "/student-grades/transcript"),
+    ]
+
+
+def request_options(selected: dict, tokens: dict) -> dict:
+    headers = {"Authorization": f"Bearer {tokens[selected['role']]}"} if selected["role"] else {}
+    return {"headers": headers, **selected["request"]}
+
+
+# SQL statements of one request to each route, sent through the application in this process
+async def count_statements(selected: list, tokens: dict) -> dict:
+    from sqlalchemy import event
+    from app.database import async_engine, engine
+    from app.main import create_app
+
+    executed = []
+    count = lambda *args: executed.append(None)
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", count)
+
+    counts = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app()), base_url="http://benchmark") as client:
+        for benchmark in selected:
+            executed.clear()
+            await client.request(benchmark["method"], benchmark["path"], **request_options(benchmark, tokens))
+            counts[benchmark["route"]] = len(executed)
+    return counts
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args, manifest: dict) -> dict:
+    selected = [benchmark for benchmark in routes(manifest) if not args.route or any(name in benchmark["route"] for name in args.route)]
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        tokens = {role: await login(client, manifest[role]["email"], manifest["password"]) for role in ROLES}
+        results = []
+        for benchmark in selected:
+            result = await run_path(client, benchmark["path"], args.concurrency, args.duration,
+                                    method=benchmark["method"], **request_options(benchmark, tokens))
+            results.append({"route": benchmark["route"], "role": benchmark["role"], **result})
+
+    if args.sql_counts:
+        counts = await count_statements(selected, tokens)
+        for result in results:
+            result["sql_statements"] = counts[result["route"]]
+
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "scale": manifest["scale"],
+        "routes": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifest", default="benchmarks/results/seed.json", help="Written by benchmarks.seed")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--route", action="append", help="Only run the routes containing this text, can be repeated")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per route")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--no-sql-counts", dest="sql_counts", action="store_false",
+                        help="Skip counting statements, e.g. when this machine has no access to the database")
+    parser.add_argument("--output", help="Result file (default benchmarks/results/<time>-<commit>.json)")
+    args = parser.parse_args()
+
+    with open(args.manifest) as file:
+        manifest = json.load(file)
+
+    report = asyncio.run(main(args, manifest))
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"{datetime.now():%Y%m%d-%H%M%S}-{(report['commit'] or 'unknown')[:12]}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {output}")
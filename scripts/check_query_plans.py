@@ -0,0 +1,124 @@
+"""Check that the routers' lookups are served by indexes.
+
+Runs EXPLAIN on the queries issued by app/routers against a seeded PostgreSQL
+database and exits with status 1 when any of them sequentially scans a table
+holding more rows than the threshold.
+
+    python -m scripts.check_query_plans [--threshold 10000] [--url postgresql://...]
+"""
+import argparse
+import sys
+from datetime import date
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import aliased
+
+from app import models
+from app.gradebook import gradebook_statement
+
+
+# Build the router queries using ids sampled from the seeded data
+def router_queries(conn):
+    enrollment = conn.execute(select(models.StudentCourse).limit(1)).first()
+    teacher = conn.execute(select(models.Teacher).limit(1)).first()
+    student = conn.execute(select(models.Student).limit(1)).first()
+    user = conn.execute(select(models.User).limit(1)).first()
+    grade = conn.execute(select(models.Grade).limit(1)).first()
+    if not (enrollment and teacher and student and user):
+        sys.exit("The database has to be seeded with users, students, teachers and enrollments first.")
+
+    student_user = aliased(models.User)
+    teacher_user = aliased(models.User)
+    grade_student_id = grade.student_id if grade else student.id
+    grade_course_id = grade.course_id if grade else enrollment.course_id
+
+    return {
+        "login: user by email": select(models.User).where(models.User.email == user.email),
+        "teacher by user_id": select(models.Teacher).where(models.Teacher.user_id == teacher.user_id),
+        "student by user_id": select(models.Student).where(models.Student.user_id == student.user_id),
+        "student by guardian_email": select(models.Student).where(models.Student.guardian_email == student.guardian_email),
+        "courses by teacher_id": select(models.Course).where(models.Course.teacher_id == teacher.id),
+        "teacher_verify_course": select(models.StudentCourse).where(
+            models.StudentCourse.teacher_id == enrollment.teacher_id,
+            models.StudentCourse.student_id == enrollment.student_id,
+            models.StudentCourse.course_id == enrollment.course_id
+        ),
+        "course roster": select(models.StudentCourse, models.Student, student_user, models.Teacher, teacher_user)
+            .join(models.Student, models.StudentCourse.student_id == models.Student.id)
+            .join(student_user, models.Student.user_id == student_user.id)
+            .join(models.Teacher, models.StudentCourse.teacher_id == models.Teacher.id)
+            .join(teacher_user, models.Teacher.user_id == teacher_user.id)
+            .where(models.StudentCourse.course_id == enrollment.course_id),
+        "enrollments by student": select(models.StudentCourse).where(models.StudentCourse.student_id == enrollment.student_id),
+        "attendance duplicate check": select(models.Attendance).where(
+            models.Attendance.course_id == enrollment.course_id,
+            models.Attendance.attendance_date == date.today(),
+            models.Attendance.student_id == enrollment.student_id
+        ),
+        "attendance by course": select(models.Attendance).where(
+            models.Attendance.course_id == enrollment.course_id,
+            models.Attendance.status != "present"
+        ),
+        "attendance by student": select(models.Attendance, models.Course.course_name)
+            .join(models.Course, models.Course.id == models.Attendance.course_id)
+            .where(models.Attendance.student_id == enrollment.student_id),
+        "grade duplicate check": select(models.Grade).where(
+            models.Grade.student_id == grade_student_id,
+            models.Grade.course_id == grade_course_id
+        ),
+        "grades by student": select(models.Grade, models.Course.course_name)
+            .join(models.Course, models.Course.id == models.Grade.course_id)
+            .where(models.Grade.student_id == grade_student_id),
+        "grades by course": select(func.count()).select_from(models.Grade).where(models.Grade.course_id == grade_course_id),
+        "course gradebook": gradebook_statement(enrollment.course_id),
+    }
+
+
+# Yield every node of an EXPLAIN (FORMAT JSON) plan
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def check(url: str, threshold: int) -> int:
+    engine = create_engine(url)
+    failures = []
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+        row_estimates = dict(conn.exec_driver_sql(
+            "SELECT relname, reltuples::bigint FROM pg_class WHERE relkind IN ('r', 'p')"
+        ).all())
+
+        for name, statement in router_queries(conn).items():
+            compiled = statement.compile(dialect=postgresql.dialect())
+            plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()[0]["Plan"]
+
+            scans = [
+                node["Relation Name"] for node in plan_nodes(plan)
+                if node["Node Type"] == "Seq Scan" and row_estimates.get(node["Relation Name"], 0) > threshold
+            ]
+            print(f"{'FAIL' if scans else 'ok':4}  {name}" + (f"  (seq scan on {', '.join(scans)})" if scans else ""))
+            if scans:
+                failures.append(name)
+
+    if failures:
+        print(f"\n{len(failures)} router queries fall back to a sequential scan on tables above {threshold} rows.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=int, default=10000, help="Tables with more rows than this must not be sequentially scanned")
+    parser.add_argument("--url", help="Database URL, defaults to the application settings")
+    args = parser.parse_args()
+
+    if args.url is None:
+        from app.database import SQLALCHEMY_DATABASE_URL
+        args.url = SQLALCHEMY_DATABASE_URL
+
+    sys.exit(check(args.url, args.threshold))
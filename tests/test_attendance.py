@@ -0,0 +1,43 @@
+from app import models
+from app.routers.dependencies import TEACHER_ROLE_ID
+
+
+# Client of the teacher of a new course, with the ids of its students
+def teacher_of_new_course(client, make_course, db, students: int):
+    course_id = make_course(students)
+    enrolled = db.query(models.StudentCourse).filter(models.StudentCourse.course_id == course_id).order_by(models.StudentCourse.student_id).all()
+    teacher = db.query(models.Teacher).filter(models.Teacher.id == enrolled[0].teacher_id).one()
+    return client(user_id=teacher.user_id, role_id=TEACHER_ROLE_ID), course_id, [row.student_id for row in enrolled]
+
+
+# Both create routes answer a second record for the same session with 409
+def test_duplicate_attendance_conflicts(client, make_course, db):
+    api, course_id, (student_id,) = teacher_of_new_course(client, make_course, db, 1)
+    record = {"course_id": course_id, "student_id": student_id, "status": "Absent", "attendance_date": "2024-09-02"}
+
+    created = api.post("/teachers-attendance/", json=record)
+    assert created.status_code == 201
+    assert created.json()["status"] == "absent"
+
+    assert api.post("/teachers-attendance/", json=record).status_code == 409
+
+
+# Students already recorded for the session are reported as errors, the rest of the roll is inserted
+def test_bulk_attendance_reports_recorded_students(client, make_course, db):
+    api, course_id, student_ids = teacher_of_new_course(client, make_course, db, 3)
+    api.post("/teachers-attendance/", json={"course_id": course_id, "student_id": student_ids[0], "attendance_date": "2024-09-02"})
+
+    response = api.post("/teachers-attendance/bulk", json={
+        "course_id": course_id,
+        "attendance_date": "2024-09-02",
+        "records": [{"student_id": student_ids[0]}, {"student_id": student_ids[1], "status": "LATE"},
+                    {"student_id": student_ids[2], "status": "asleep"}, {"student_id": 9999}]
+    })
+
+    assert response.status_code == 201
+    body = response.json()
+    assert body["inserted"] == 1
+    assert [(record["student_id"], record["status"]) for record in body["attendance_records"]] == [(student_ids[1], "late")]
+    assert [error["student_id"] for error in body["errors"]] == [student_ids[0], student_ids[2], 9999]
+    assert "already exists" in body["errors"][0]["detail"]
+    assert db.query(models.Attendance).filter(models.Attendance.course_id == course_id).count() == 2
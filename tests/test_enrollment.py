@@ -0,0 +1,41 @@
+from app import models
+
+
+# The roster is loaded with a fixed number of statements, whatever the size of the course
+def test_course_roster_query_count_does_not_grow_with_roster(client, make_course, statements):
+    api = client()
+    counts = {}
+    for size in (3, 30):
+        course_id = make_course(size)
+        statements.clear()
+
+        response = api.get(f"/admin/enroll-student/{course_id}")
+
+        assert response.status_code == 200
+        assert response.json()["total"] == size
+        counts[size] = len(statements)
+
+    assert counts[3] == counts[30]
+
+
+# Students already enrolled with the teacher, or listed twice, are skipped; unknown ones are reported
+def test_bulk_enrollment_skips_existing_enrollments(client, make_course, db):
+    course_id = make_course(3)
+    enrolled = db.query(models.StudentCourse).filter(models.StudentCourse.course_id == course_id).all()
+    teacher_id = enrolled[0].teacher_id
+    new = [row.student_id for row in db.query(models.StudentCourse.student_id).filter(models.StudentCourse.course_id == make_course(2))]
+    request = {"course_id": course_id, "teacher_id": teacher_id, "enrollment_date": "2024-09-01",
+               "student_ids": [row.student_id for row in enrolled] + new + [new[0], 9999]}
+    api = client()
+
+    response = api.post("/admin/enroll-student/bulk", json=request)
+
+    assert response.status_code == 201
+    body = response.json()
+    assert (body["inserted"], body["skipped"]) == (2, 4)
+    assert sorted(body["enrolled_student_ids"]) == sorted(new)
+    assert body["errors"] == [{"student_id": 9999, "detail": "student with id=9999 not found"}]
+
+    again = api.post("/admin/enroll-student/bulk", json=request).json()
+    assert (again["inserted"], again["skipped"]) == (0, 6)
+    assert db.query(models.StudentCourse).filter(models.StudentCourse.course_id == course_id).count() == 5
@@ -0,0 +1,55 @@
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from app import models
+from app.gradebook import build_gradebook
+
+
+# A row of the gradebook query; GROUPING SETS leaves the columns of the other groupings NULL
+def row(is_summary=0, is_total=0, student_id=None, last_name=None, grade_id=None, grade=None, graded_at=None,
+        letter_grade=None, students=1, graded=0, numeric_graded=0, mean=None, median=None):
+    return SimpleNamespace(
+        student_id=student_id, first_name="First" if student_id else None, last_name=last_name,
+        email=f"{last_name}@example.com" if student_id else None, grade_id=grade_id, grade=grade, graded_at=graded_at,
+        letter_grade=letter_grade, is_summary=is_summary, is_total=is_total, students=students, graded=graded,
+        numeric_graded=numeric_graded, mean=mean, median=median
+    )
+
+
+def test_gradebook_from_grouped_rows():
+    course = models.Course(id=7, course_name="Chemistry")
+    rows = [
+        row(student_id=1, last_name="Ada", grade_id=10, grade="91", graded_at=datetime(2024, 10, 1, 9, 30), graded=1),
+        row(student_id=2, last_name="Bo", grade_id=11, grade="b+", graded_at=datetime(2024, 10, 2), letter_grade="B+", graded=1),
+        row(student_id=3, last_name="Cy", grade_id=12, grade="84", graded_at=datetime(2024, 10, 3), graded=1),
+        row(student_id=4, last_name="Di"),
+        # Per letter grade, numeric and missing grades fall in the NULL group
+        row(is_summary=1, letter_grade="B+", graded=1),
+        row(is_summary=1, students=3, graded=2, numeric_graded=2),
+        row(is_summary=1, is_total=1, students=4, graded=3, numeric_graded=2, mean=Decimal("87.5"), median=87.5),
+    ]
+
+    gradebook = build_gradebook(course, rows)
+
+    assert (gradebook.course_id, gradebook.course_name) == (7, "Chemistry")
+    assert [(entry.student_id, entry.grade) for entry in gradebook.students] == [(1, "91"), (2, "b+"), (3, "84"), (4, None)]
+    assert gradebook.students[0].graded_at.isoformat() == "2024-10-01"
+    assert gradebook.students[3].graded_at is None
+    assert gradebook.statistics.model_dump() == {
+        "enrolled": 4, "graded": 3, "missing": 1, "distribution": {"B+": 1},
+        "numeric_graded": 2, "mean": 87.5, "median": 87.5
+    }
+
+
+def test_gradebook_without_numeric_grades_has_no_mean():
+    course = models.Course(id=7, course_name="Chemistry")
+    rows = [
+        row(student_id=1, last_name="Ada"),
+        row(is_summary=1, students=1),
+        row(is_summary=1, is_total=1, students=1),
+    ]
+
+    statistics = build_gradebook(course, rows).statistics
+
+    assert (statistics.enrolled, statistics.graded, statistics.missing) == (1, 0, 1)
+    assert (statistics.mean, statistics.median) == (None, None)
@@ -0,0 +1,60 @@
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from app.instrumentation import SQLInstrumentationMiddleware, render_metrics
+from app.metrics import Histogram, exposition
+
+
+def test_counter_and_gauge_lines():
+    assert exposition("jobs_total", "counter", "Jobs run", [({"queue": "default"}, 3), ({}, 5)]) == [
+        "# HELP jobs_total Jobs run",
+        "# TYPE jobs_total counter",
+        'jobs_total{queue="default"} 3',
+        "jobs_total 5",
+    ]
+
+
+def test_label_values_are_escaped():
+    lines = exposition("workers", "gauge", "Workers", [({"name": 'say "hi"\\\n'}, 1)])
+
+    assert lines[-1] == 'workers{name="say \\"hi\\"\\\\\\n"} 1'
+
+
+# Buckets are cumulative and end with +Inf, which counts every observation
+def test_histogram_lines():
+    histogram = Histogram((1, 10))
+    for value in (0.5, 1, 5, 50):
+        histogram.observe(value)
+
+    assert exposition("rows", "histogram", "Rows", [({"route": "/a"}, histogram)]) == [
+        "# HELP rows Rows",
+        "# TYPE rows histogram",
+        'rows_bucket{route="/a",le="1"} 2',
+        'rows_bucket{route="/a",le="10"} 3',
+        'rows_bucket{route="/a",le="+Inf"} 4',
+        'rows_sum{route="/a"} 56.5',
+        'rows_count{route="/a"} 4',
+    ]
+
+
+# Requests are labelled with their route template, not the requested path
+router = APIRouter(prefix="/metrics-test")
+
+
+@router.get("/items/{item_id}", status_code=202)
+def get_item(item_id: int):
+    return {}
+
+
+def test_requests_are_recorded_by_route_template():
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(SQLInstrumentationMiddleware)
+    api = TestClient(app)
+
+    for item_id in (1, 2):
+        api.get(f"/metrics-test/items/{item_id}")
+
+    lines = render_metrics().splitlines()
+    assert 'http_requests_total{method="GET",route="/metrics-test/items/{item_id}",status="202"} 2' in lines
+    assert 'db_statements_per_request_count{method="GET",route="/metrics-test/items/{item_id}"} 2' in lines
+    assert 'db_rows_per_request_bucket{method="GET",route="/metrics-test/items/{item_id}",le="1"} 2' in lines
@@ -0,0 +1,38 @@
+from datetime import date
+import pytest
+from fastapi import HTTPException
+from app import models
+from app.pagination import decode_cursor, encode_cursor
+
+
+COLUMNS = [models.Student.enrollment_date, models.Student.id]
+
+
+def test_cursor_round_trip_restores_dates_and_ids():
+    cursor = encode_cursor("-enrollment_date", [date(2024, 9, 1), 42])
+
+    assert decode_cursor(cursor, "-enrollment_date", COLUMNS) == [date(2024, 9, 1), 42]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    encode_cursor("enrollment_date", [date(2024, 9, 1), 42])[:-4],  # Truncated
+    encode_cursor("enrollment_date", [date(2024, 9, 1)]),           # Wrong number of values
+    encode_cursor("enrollment_date", ["yesterday", 42]),            # Not a date
+    encode_cursor("enrollment_date", [date(2024, 9, 1), "x"]),      # Not an id
+])
+def test_tampered_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor, "enrollment_date", COLUMNS)
+
+    assert excinfo.value.status_code == 400
+
+
+# A cursor issued for one sort can't be replayed with another
+def test_cursor_of_another_sort_is_rejected():
+    cursor = encode_cursor("enrollment_date", [date(2024, 9, 1), 42])
+
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor, "-enrollment_date", COLUMNS)
+
+    assert excinfo.value.status_code == 400
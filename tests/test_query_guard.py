@@ -0,0 +1,85 @@
+import pytest
+from fastapi import APIRouter, Depends
+from pydantic import ValidationError
+from sqlalchemy import event, select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import Session
+from app import models, query_guard
+from app.config import Settings, settings
+from app.database import get_db
+
+
+# Routes with the mistakes the guard is meant to catch
+router = APIRouter(prefix="/query-guard-test")
+
+
+@router.get("/repeated")
+def repeated_statements(db: Session = Depends(get_db)):
+    for user_id in range(1, 6):
+        db.execute(select(models.User).where(models.User.id == user_id)).first()
+    return {}
+
+
+@router.get("/lazy/{enrollment_id}")
+def lazy_load(enrollment_id: int, db: Session = Depends(get_db)):
+    enrollment = db.get(models.StudentCourse, enrollment_id)
+    return {"student_id": enrollment.student.id}
+
+
+# Turn the features on for one test, with an empty report; the listeners are removed afterwards
+@pytest.fixture
+def guard(engine, monkeypatch):
+    monkeypatch.setattr(query_guard, "report", query_guard.QueryReport())
+
+    def enable(n_plus_one: bool = False, lazy_load_guard: str = "off"):
+        monkeypatch.setattr(settings, "N_PLUS_ONE_DETECTION", n_plus_one)
+        monkeypatch.setattr(settings, "LAZY_LOAD_GUARD", lazy_load_guard)
+        query_guard.install([engine])
+
+    yield enable
+    if event.contains(engine, "after_cursor_execute", query_guard._after_cursor_execute):
+        event.remove(engine, "after_cursor_execute", query_guard._after_cursor_execute)
+    if event.contains(Session, "do_orm_execute", query_guard._do_orm_execute):
+        event.remove(Session, "do_orm_execute", query_guard._do_orm_execute)
+
+
+def first_enrollment_id(db: Session, course_id: int) -> int:
+    return db.scalar(select(models.StudentCourse.id).where(models.StudentCourse.course_id == course_id))
+
+
+@pytest.mark.parametrize("value", ["true", "Raise", "on"])
+def test_lazy_load_guard_rejects_unknown_modes(value):
+    with pytest.raises(ValidationError):
+        Settings(LAZY_LOAD_GUARD=value)
+
+
+def test_repeated_statements_are_reported(guard, client):
+    guard(n_plus_one=True)
+
+    response = client(router).get("/query-guard-test/repeated")
+
+    assert response.status_code == 200
+    findings = query_guard.report.snapshot()["GET /query-guard-test/repeated"]["repeated_statements"]
+    assert [finding["max_repeats"] for finding in findings] == [5]
+    assert "FROM users" in findings[0]["statement"]
+
+
+def test_lazy_loads_are_reported_in_warn_mode(guard, client, db, make_course):
+    guard(lazy_load_guard="warn")
+    enrollment_id = first_enrollment_id(db, make_course(1))
+
+    response = client(router).get(f"/query-guard-test/lazy/{enrollment_id}")
+
+    assert response.status_code == 200
+    lazy_loads = query_guard.report.snapshot()["GET /query-guard-test/lazy/{enrollment_id}"]["lazy_loads"]
+    assert lazy_loads["StudentCourse.student"]["count"] == 1
+
+
+def test_lazy_loads_raise_in_raise_mode(guard, engine, db, make_course):
+    guard(lazy_load_guard="raise")
+    enrollment_id = first_enrollment_id(db, make_course(1))
+
+    with Session(engine) as session:
+        enrollment = session.get(models.StudentCourse, enrollment_id)
+        with pytest.raises(InvalidRequestError, match="Unplanned lazy load of StudentCourse.student"):
+            enrollment.student
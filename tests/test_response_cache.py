@@ -0,0 +1,80 @@
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from app import oauth2, response_cache, schemas
+from app.response_cache import CachedResponse, MemoryBackend, bump, cached_response, etag_matches
+
+
+ETAG = '"abc"'
+
+
+@pytest.mark.parametrize("if_none_match, matches", [
+    (None, False),
+    ("", False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", "abc"', True),
+    ("*", True),
+    ('"xyz"', False),
+    ("abc", False),  # Unquoted
+])
+def test_etag_matches(if_none_match, matches):
+    assert etag_matches(if_none_match, ETAG) is matches
+
+
+def test_bump_increments_only_the_given_namespaces():
+    backend = MemoryBackend(maxsize=10, ttl=60)
+    assert backend.get_versions(["courses", "students"]) == [0, 0]
+
+    backend.bump(["courses"])
+    backend.bump(["courses", "students"])
+
+    assert backend.get_versions(["courses", "students", "grades"]) == [2, 1, 0]
+
+
+# A route served through the cache, counting how often it builds its response
+router = APIRouter(prefix="/response-cache-test")
+builds = []
+
+
+@router.get("/widgets")
+def list_widgets(cache: CachedResponse = Depends(cached_response("widgets"))):
+    if cache.hit:
+        return cache.response
+    builds.append(1)
+    return cache.store({"widgets": len(builds)})
+
+
+@pytest.fixture
+def api():
+    if response_cache.backend is None:
+        pytest.skip("RESPONSE_CACHE_BACKEND is none")
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[oauth2.get_current_user] = lambda: schemas.TokenData(id=1, role_id=1)
+    builds.clear()
+    bump("widgets")  # Start from a version no other test has cached
+    return TestClient(app)
+
+
+def test_cached_response_is_revalidated_with_its_etag(api):
+    first = api.get("/response-cache-test/widgets")
+    etag = first.headers["ETag"]
+
+    assert first.status_code == 200
+    assert api.get("/response-cache-test/widgets").json() == first.json()
+    not_modified = api.get("/response-cache-test/widgets", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    assert len(builds) == 1
+
+
+def test_bump_retires_the_cached_response(api):
+    etag = api.get("/response-cache-test/widgets").headers["ETag"]
+
+    bump("widgets")
+    response = api.get("/response-cache-test/widgets", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json() == {"widgets": 2}
+    assert response.headers["ETag"] != etag
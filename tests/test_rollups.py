@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+import pytest
+from sqlalchemy.dialects import postgresql
+from app.rollups import COUNT_COLUMNS, apply_attendance_changes, week_start
+
+
+# Records the statements it's asked to run instead of sending them to a database
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+
+# Summary rows of the INSERT ... ON CONFLICT run by apply_attendance_changes, as dicts
+def summary_rows(changes) -> list:
+    db = RecordingSession()
+    apply_attendance_changes(db, changes)
+    if not db.statements:
+        return []
+    params = db.statements[0].compile(dialect=postgresql.dialect()).params
+    rows = []
+    while f"week_start_m{len(rows)}" in params:
+        rows.append({column: params[f"{column}_m{len(rows)}"] for column in ("student_id", "course_id", "week_start") + COUNT_COLUMNS})
+    return rows
+
+
+# Weeks start on Monday
+@pytest.mark.parametrize("offset", range(7))
+def test_week_start_buckets_a_week_on_its_monday(offset):
+    monday = date(2024, 9, 2)
+
+    assert week_start(monday + timedelta(days=offset)) == monday
+
+
+def test_week_start_crosses_months_and_years():
+    assert week_start(date(2024, 10, 3)) == date(2024, 9, 30)
+    assert week_start(date(2025, 1, 1)) == date(2024, 12, 30)
+
+
+def test_changes_are_merged_per_week():
+    rows = summary_rows([
+        (1, 2, date(2024, 9, 2), "absent", 1),
+        (1, 2, date(2024, 9, 6), "Late", 1),
+        (1, 2, date(2024, 9, 9), "present", 1),
+    ])
+
+    assert rows == [
+        {"student_id": 1, "course_id": 2, "week_start": date(2024, 9, 2), "present": 0, "absent": 1, "excused": 0, "late": 1, "total": 2},
+        {"student_id": 1, "course_id": 2, "week_start": date(2024, 9, 9), "present": 1, "absent": 0, "excused": 0, "late": 0, "total": 1},
+    ]
+
+
+# A status change moves one record from a column to another without changing the total
+def test_status_change_keeps_the_total():
+    rows = summary_rows([
+        (1, 2, date(2024, 9, 4), "present", -1),
+        (1, 2, date(2024, 9, 4), "excused", 1),
+    ])
+
+    assert rows == [
+        {"student_id": 1, "course_id": 2, "week_start": date(2024, 9, 2), "present": -1, "absent": 0, "excused": 1, "late": 0, "total": 0},
+    ]
+
+
+def test_changes_that_cancel_out_run_no_statement():
+    assert summary_rows([
+        (1, 2, date(2024, 9, 4), "late", -1),
+        (1, 2, date(2024, 9, 4), "late", 1),
+    ]) == []
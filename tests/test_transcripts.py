@@ -0,0 +1,53 @@
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+import pytest
+from app.config import settings
+from app.transcripts import grade_points, term_start
+
+
+# The migration backfilling student_term_gpa hard-codes the default scale and terms in SQL;
+# they have to keep matching what grade_points/term_start compute for new grades
+BACKFILL = (Path(__file__).parent.parent / "alembic" / "versions" / "9503f51548e8_add_student_term_gpa.py").read_text()
+LETTER_POINTS = {grade: float(points) for grade, points in re.findall(r"WHEN '([A-F][+-]?)' THEN ([\d.]+)", BACKFILL)}
+NUMERIC_POINTS = [[float(minimum), float(points)] for minimum, points in re.findall(r"::numeric >= (\d+) THEN ([\d.]+)", BACKFILL)]
+TERM_MONTHS = [int(month) for month in re.findall(r"extract\(month FROM graded_at\) >= (\d+) THEN \1\b", BACKFILL)] + [1]
+
+
+def test_backfill_matches_the_default_settings():
+    assert LETTER_POINTS == settings.GRADE_SCALE
+    assert NUMERIC_POINTS == settings.NUMERIC_GRADE_SCALE
+    assert sorted(TERM_MONTHS) == sorted(settings.TERM_START_MONTHS)
+
+
+@pytest.mark.parametrize("grade", sorted(LETTER_POINTS))
+def test_letter_grade_points(grade):
+    assert grade_points(grade) == Decimal(str(LETTER_POINTS[grade]))
+    assert grade_points(f" {grade.lower()} ") == Decimal(str(LETTER_POINTS[grade]))
+
+
+@pytest.mark.parametrize("grade, points", [
+    ("100", "4.0"), ("90", "4.0"), ("89.5", "3.0"), ("80", "3.0"), ("70", "2.0"), ("60", "1.0"), ("0", "0.0"),
+])
+def test_numeric_grade_points(grade, points):
+    assert grade_points(grade) == Decimal(points)
+
+
+# Grades that don't count towards the GPA
+@pytest.mark.parametrize("grade", [None, "P", "Incomplete", "-5"])
+def test_ungraded(grade):
+    assert grade_points(grade) is None
+
+
+@pytest.mark.parametrize("day, start", [
+    (date(2024, 1, 1), date(2024, 1, 1)),
+    (date(2024, 5, 31), date(2024, 1, 1)),
+    (date(2024, 6, 1), date(2024, 6, 1)),
+    (date(2024, 7, 31), date(2024, 6, 1)),
+    (date(2024, 8, 1), date(2024, 8, 1)),
+    (date(2024, 12, 31), date(2024, 8, 1)),
+    (datetime(2024, 9, 15, 23, 30), date(2024, 8, 1)),
+])
+def test_term_start(day, start):
+    assert term_start(day) == start